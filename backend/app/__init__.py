@@ -1,13 +1,15 @@
-from flask import Flask
+from flask import Flask, Response, request
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from dotenv import load_dotenv
 import os
 
+from app.services.db_routing import REPLICA_BIND, RoutingSession, engine_options
+
 load_dotenv()
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 
 
@@ -19,36 +21,93 @@ def create_app():
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    if os.getenv('DATABASE_REPLICA_URL'):
+        # GET/HEAD requests read from here, see app.services.db_routing
+        app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: os.getenv('DATABASE_REPLICA_URL')}
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
+    app.config['MAX_PER_PAGE'] = int(os.getenv('MAX_PER_PAGE', 100))
+    app.config['BATCH_MAX_ITEMS'] = int(os.getenv('BATCH_MAX_ITEMS', 100))
+    app.config['EXPORT_BATCH_SIZE'] = int(os.getenv('EXPORT_BATCH_SIZE', 500))
+    app.config['IMPORT_BATCH_SIZE'] = int(os.getenv('IMPORT_BATCH_SIZE', 500))
+    # Uncompressed size limits for uploaded zip archives
+    app.config['IMPORT_ZIP_MAX_FILE_SIZE'] = int(os.getenv('IMPORT_ZIP_MAX_FILE_SIZE', 4 * 1024 * 1024))
+    app.config['IMPORT_ZIP_MAX_TOTAL_SIZE'] = int(os.getenv('IMPORT_ZIP_MAX_TOTAL_SIZE', 64 * 1024 * 1024))
+    # Each protected note costs a bcrypt hash, run one after another in the request
+    app.config['MAX_PROTECTED_PER_REQUEST'] = int(os.getenv('MAX_PROTECTED_PER_REQUEST', 10))
 
     # Extensions
-    CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
+    CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True, expose_headers=["ETag", "Server-Timing", "X-Primary-Until"])
     db.init_app(app)
     migrate.init_app(app, db)
 
+    from app.services import access_control, content_codec, db_routing, note_grants, query_detector, revisions
+    from app.services.feed_cache import feed_cache
+    from app.services.metrics import metrics, database_health
+    from app.services.passwords import password_hasher
+    from app.services.rate_limit import rate_limiter
+    from app.services.search import search_index
+    from app.utils.tokens import token_verifier
+    db_routing.init_app(app)
+    metrics.init_app(app)
+    query_detector.init_app(app)
+    feed_cache.init_app(app)
+    note_grants.init_app(app)
+    access_control.init_app(app)
+    content_codec.init_app(app)
+    revisions.init_app(app)
+    token_verifier.init_app(app)
+    password_hasher.init_app(app)
+    rate_limiter.init_app(app)
+    search_index.init_app(app)
+
     # Import models
     from app.models.user import User
     from app.models.note import Note
     from app.models.favorite import Favorite
     from app.models.contributor import NoteContributor
+    from app.models.revision import NoteRevision
+    from app.models.trending import TrendingScore, TrendingWindow
 
     # Register blueprints
     from app.routes.auth import auth_bp
     from app.routes.notes import notes_bp
     from app.routes.favorites import favorites_bp
     from app.routes.contributors import contributors_bp
+    from app.routes.revisions import revisions_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(notes_bp, url_prefix='/api/notes')
     app.register_blueprint(favorites_bp, url_prefix='/api/favorites')
     app.register_blueprint(contributors_bp, url_prefix='/api/notes')
+    app.register_blueprint(revisions_bp, url_prefix='/api/notes')
 
-    # Create tables
-    with app.app_context():
-        db.create_all()
+    # CLI commands
+    from app.cli import notes_cli
+    app.cli.add_command(notes_cli)
+
+    # Schema comes from migrations; no connection is opened here
+    from app.services import schema
+    schema.init_app(app, db)
 
     @app.route('/api/health')
     def health():
-        return {'status': 'ok'}, 200
+        ready, databases = database_health(db.engines)
+        saturated = any(d['pool'].get('saturation', 0) >= 1 for d in databases.values())
+        status = 'unavailable' if not ready else 'degraded' if saturated else 'ok'
+        body = {'status': status, 'database': databases}
+        schema_state = app.extensions.get('schema_state')
+        if schema_state is not None and ready:
+            body['schema'] = schema_state.check(app).as_dict()
+            if not schema_state.ok:
+                body['status'] = 'degraded'
+        return body, 200 if ready else 503
+
+    @app.route('/api/metrics')
+    def prometheus_metrics():
+        token = app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return {'error': 'Unauthorized'}, 401
+        return Response(metrics.render(db.engines), mimetype='text/plain; version=0.0.4')
 
     return app
@@ -0,0 +1,212 @@
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import undefer_group
+from app import db
+from app.models.note import Note, content_summary
+from app.models.favorite import Favorite
+from app.models.user import User
+from app.services.content_codec import encode_content
+from app.services.note_import import import_notes, read_markdown_dir, read_upload
+from app.services.search import searches_content_column
+from app.services.trending import PERIODS, refresh as refresh_trending_period
+
+notes_cli = AppGroup('notes', help='Note maintenance commands.')
+
+
+@notes_cli.command('reconcile-favorites')
+@click.option('--batch-size', default=500, show_default=True, help='Notes checked per transaction.')
+def reconcile_favorites(batch_size):
+    """Recompute notes.favorite_count where it drifted from the favorites table."""
+    actual_count = select(func.count(Favorite.id))\
+        .where(Favorite.note_id == Note.id)\
+        .scalar_subquery()
+
+    last_id = 0
+    checked = fixed = 0
+    while True:
+        rows = db.session.query(Note.id, Note.favorite_count, actual_count)\
+            .filter(Note.id > last_id)\
+            .order_by(Note.id)\
+            .limit(batch_size)\
+            .all()
+        if not rows:
+            break
+
+        drifted = [note_id for note_id, stored, actual in rows if stored != actual]
+        if drifted:
+            # Recompute inside the UPDATE so toggles racing with this job are not overwritten
+            db.session.execute(
+                update(Note).where(Note.id.in_(drifted))
+                .values(favorite_count=actual_count, updated_at=Note.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+
+        checked += len(rows)
+        fixed += len(drifted)
+        last_id = rows[-1][0]
+
+    click.echo(f'Checked {checked} notes, fixed {fixed} favorite counters.')
+
+
+@notes_cli.command('import')
+@click.argument('path', type=click.Path(exists=True))
+@click.option('--user', 'username', required=True, help='Username or email of the owner.')
+@click.option('--format', 'import_format', type=click.Choice(['ndjson', 'zip', 'dir']),
+              help='Source format (default: from the path).')
+@click.option('--batch-size', default=500, show_default=True, help='Notes inserted per transaction.')
+def import_notes_command(path, username, import_format, batch_size):
+    """Bulk import notes from an NDJSON file, a zip of Markdown files or a Markdown directory."""
+    user = User.query.filter((User.username == username) | (User.email == username)).first()
+    if not user:
+        raise click.ClickException(f'User not found: {username}')
+
+    if import_format is None:
+        if os.path.isdir(path):
+            import_format = 'dir'
+        elif path.lower().endswith('.zip'):
+            import_format = 'zip'
+        else:
+            import_format = 'ndjson'
+
+    def progress(result):
+        click.echo(f'Imported {result.imported} notes, {result.failed} failed...', err=True)
+
+    if import_format == 'dir':
+        result = import_notes(read_markdown_dir(path), user.id, batch_size, progress, max_errors=None)
+    else:
+        with open(path, 'rb') as f:
+            result = import_notes(read_upload(f, import_format), user.id, batch_size, progress, max_errors=None)
+
+    for error in result.errors:
+        click.echo(f"{error['ref']}: {error['error']}", err=True)
+    click.echo(f'Imported {result.imported} notes, {result.failed} failed.')
+
+
+@notes_cli.command('backfill-excerpts')
+@click.option('--batch-size', default=500, show_default=True, help='Notes updated per transaction.')
+def backfill_excerpts(batch_size):
+    """Fill excerpt/content_length/content_hash for notes that do not have them yet."""
+    last_id = 0
+    filled = 0
+    while True:
+        batch = Note.query.options(undefer_group('content'))\
+            .filter(Note.id > last_id, Note.content_hash.is_(None))\
+            .order_by(Note.id)\
+            .limit(batch_size)\
+            .all()
+        if not batch:
+            break
+
+        notes = Note.__table__
+        db.session.execute(
+            update(notes).where(notes.c.id == bindparam('note_id')).values(
+                excerpt=bindparam('excerpt'),
+                content_length=bindparam('content_length'),
+                content_hash=bindparam('content_hash'),
+                updated_at=notes.c.updated_at,
+            ),
+            [{'note_id': note.id, **content_summary(note.content)} for note in batch],
+        )
+        db.session.commit()
+
+        filled += len(batch)
+        last_id = batch[-1].id
+
+    click.echo(f'Filled excerpts for {filled} notes.')
+
+
+@notes_cli.command('compress-content')
+@click.option('--batch-size', default=200, show_default=True, help='Notes rewritten per transaction.')
+@click.option('--threshold', type=int, default=None,
+              help='Minimum body size in bytes (default: NOTE_COMPRESSION_THRESHOLD).')
+@click.option('--decompress', is_flag=True, help='Store every compressed body as plain text again.')
+@click.option('--pause', default=0.0, show_default=True, help='Seconds to sleep between batches.')
+def compress_content(batch_size, threshold, decompress, pause):
+    """Move existing note bodies into (or out of) compressed storage, batch by batch.
+
+    Safe to run while the app is serving: a row is only rewritten if its
+    content_hash still matches what was read, so concurrent edits win.
+    """
+    if threshold is None:
+        threshold = current_app.config['NOTE_COMPRESSION_THRESHOLD']
+    if not decompress and not threshold:
+        raise click.ClickException('Set --threshold or NOTE_COMPRESSION_THRESHOLD')
+    if not decompress and searches_content_column(current_app.config):
+        raise click.ClickException('Compressed notes would drop out of MySQL FULLTEXT content search; '
+                                   'use SEARCH_BACKEND=memory to compress')
+
+    notes = Note.__table__
+    condition = Note.content_compressed.isnot(None)
+    if not decompress:
+        # content_length counts characters, which never exceed the UTF-8 size
+        condition = Note.content_compressed.is_(None) & (Note.content_length * 4 >= threshold)
+
+    last_id = 0
+    changed = saved = 0
+    while True:
+        batch = Note.query.options(undefer_group('content'))\
+            .filter(Note.id > last_id, condition)\
+            .order_by(Note.id)\
+            .limit(batch_size)\
+            .all()
+        if not batch:
+            break
+
+        last_id = batch[-1].id
+        rows = []
+        for note in batch:
+            content = note.content
+            text, blob = (content, None) if decompress else encode_content(content, threshold=threshold)
+            if blob is None and not decompress:
+                continue
+            rows.append({'note_id': note.id, 'old_hash': note.content_hash, 'text': text, 'blob': blob})
+            stored = len(note.content_compressed or b'') + len(note._content.encode('utf-8'))
+            saved += stored - len(blob or b'') - len(text.encode('utf-8'))
+
+        if rows:
+            db.session.execute(
+                update(notes)
+                .where(notes.c.id == bindparam('note_id'), notes.c.content_hash == bindparam('old_hash'))
+                .values(content=bindparam('text'), content_compressed=bindparam('blob'),
+                        updated_at=notes.c.updated_at),
+                rows,
+            )
+        db.session.commit()
+        db.session.expunge_all()
+
+        changed += len(rows)
+        click.echo(f'Rewrote {changed} notes (up to id {last_id})...', err=True)
+        if pause:
+            time.sleep(pause)
+
+    click.echo(f'Rewrote {changed} notes, {saved} bytes saved.')
+
+
+@notes_cli.command('refresh-trending')
+@click.option('--window', 'windows', multiple=True, type=click.Choice(list(PERIODS)),
+              help='Period to rebuild (default: all of them). Repeatable.')
+@click.option('--every', default=0.0, show_default=True,
+              help='Keep running and refresh every SECONDS (0 refreshes once).')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows read and written per batch.')
+def refresh_trending(windows, every, batch_size):
+    """Rebuild the trending rankings from recent favorites.
+
+    Favorites update the rankings as they happen; this drops favorites that
+    aged out of a window and rescales the scores. Run it every few minutes,
+    from cron or as a long-running process with --every.
+    """
+    while True:
+        for period in windows or PERIODS:
+            started = time.perf_counter()
+            count = refresh_trending_period(period, batch_size=batch_size)
+            click.echo(f'Trending {period}: {count} notes ranked in {time.perf_counter() - started:.2f}s.')
+        if not every:
+            break
+        db.session.remove()
+        time.sleep(every)
@@ -10,7 +10,10 @@ class NoteContributor(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    __table_args__ = (db.UniqueConstraint('note_id', 'user_id', name='unique_contributor'),)
+    __table_args__ = (
+        db.UniqueConstraint('note_id', 'user_id', name='unique_contributor'),
+        db.Index('ix_note_contributors_user_created', 'user_id', 'created_at', 'id'),
+    )
 
     note = db.relationship('Note', backref=db.backref('contributors', lazy=True, cascade='all, delete-orphan'))
     user = db.relationship('User', backref=db.backref('contributions', lazy=True))
@@ -10,7 +10,13 @@ class Favorite(db.Model):
     note_id = db.Column(db.Integer, db.ForeignKey('notes.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    __table_args__ = (db.UniqueConstraint('user_id', 'note_id', name='unique_favorite'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'note_id', name='unique_favorite'),
+        db.Index('ix_favorites_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_favorites_note', 'note_id'),
+        # Trending refresh reads only the favorites inside its window
+        db.Index('ix_favorites_created', 'created_at'),
+    )
 
     def to_dict(self):
         return {
@@ -1,6 +1,31 @@
+import hashlib
+
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import deferred
+
 from app import db
+from app.services.content_codec import decompress, encode_content
+from app.services.passwords import password_hasher
 from datetime import datetime
-import bcrypt
+
+EXCERPT_LENGTH = 100
+
+
+def content_summary(content):
+    """The stored excerpt/length/hash columns for a content value."""
+    content = content or ''
+    return {
+        'excerpt': content[:EXCERPT_LENGTH],
+        'content_length': len(content),
+        'content_hash': hashlib.sha256(content.encode('utf-8')).hexdigest(),
+    }
+
+
+def content_columns(content):
+    """Every column written for a content value, keyed by mapped attribute name."""
+    text, blob = encode_content(content or '')
+    return {'_content': text, 'content_compressed': blob, **content_summary(content)}
 
 
 class Note(db.Model):
@@ -8,27 +33,74 @@ class Note(db.Model):
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     title = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    # Deferred: list views read `excerpt`; the body loads only when `content` is accessed.
+    # Large bodies go to content_compressed instead (see app.services.content_codec).
+    _content = deferred(db.Column('content', db.Text, nullable=False), group='content')
+    content_compressed = deferred(
+        db.Column(db.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql'), default=None),
+        group='content',
+    )
+    excerpt = db.Column(db.String(EXCERPT_LENGTH), default=None)
+    content_length = db.Column(db.Integer, default=None)
+    content_hash = db.Column(db.String(64), default=None)
     visibility = db.Column(db.String(20), nullable=False, default='public')  # public, private, protected
     password_hash = db.Column(db.String(255), default=None)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Maintained by toggle_favorite; `flask notes reconcile-favorites` repairs drift
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        # Explore feed: walked in order, visibility is checked from the index
+        # itself, so a page stops after LIMIT rows and COUNT never reads the table
+        db.Index('ix_notes_created', 'created_at', 'id', 'visibility'),
+        db.Index('ix_notes_popular', 'favorite_count', 'created_at', 'id', 'visibility'),
+        # My notes
+        db.Index('ix_notes_user_created', 'user_id', 'created_at', 'id'),
+    )
 
     favorites = db.relationship('Favorite', backref='note', lazy=True, cascade='all, delete-orphan')
 
+    @hybrid_property
+    def content(self):
+        if self.content_compressed is not None:
+            return decompress(self.content_compressed)
+        return self._content
+
+    @content.inplace.setter
+    def _content_setter(self, content):
+        for attribute, value in content_columns(content).items():
+            setattr(self, attribute, value)
+
+    @content.inplace.expression
+    @classmethod
+    def _content_expression(cls):
+        return cls._content
+
     def set_password(self, password):
         if password:
-            self.password_hash = bcrypt.hashpw(
-                password.encode('utf-8'), bcrypt.gensalt()
-            ).decode('utf-8')
+            self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
         if not self.password_hash:
             return False
-        return bcrypt.checkpw(
-            password.encode('utf-8'),
-            self.password_hash.encode('utf-8')
+        if not password_hasher.verify(password, self.password_hash):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
+
+    @classmethod
+    def adjust_favorite_count(cls, note_ids, delta):
+        """Increment/decrement favorite_count in SQL, so concurrent toggles never lose an update."""
+        query = cls.query.filter(cls.id.in_(note_ids))
+        if delta < 0:
+            query = query.filter(cls.favorite_count >= -delta)
+        query.update(
+            # Keep updated_at untouched: a favorite is not an edit of the note
+            {cls.favorite_count: cls.favorite_count + delta, cls.updated_at: cls.updated_at},
+            synchronize_session=False,
         )
 
     def to_dict(self, include_content=True, current_user_id=None):
@@ -41,7 +113,7 @@ class Note(db.Model):
             'author': self.author.to_dict() if self.author else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'favorite_count': len(self.favorites) if self.favorites else 0,
+            'favorite_count': self.favorite_count or 0,
         }
 
         # Protected notes: ALWAYS hide content (must verify password first)
@@ -49,7 +121,10 @@ class Note(db.Model):
             data['content'] = None
         elif include_content:
             data['content'] = self.content
-        else:
+        elif self.content_hash is None:
+            # Row written before the excerpt columns were backfilled
             data['content'] = self.content[:100] + '...' if self.content and len(self.content) > 100 else self.content
+        else:
+            data['content'] = self.excerpt + '...' if self.content_length > EXCERPT_LENGTH else self.excerpt
 
         return data
@@ -0,0 +1,40 @@
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import deferred
+
+from app import db
+from datetime import datetime
+
+
+class NoteRevision(db.Model):
+    """One version of a note's title and content (see app.services.revisions)."""
+    __tablename__ = 'note_revisions'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    note_id = db.Column(db.Integer, db.ForeignKey('notes.id'), nullable=False)
+    number = db.Column(db.Integer, nullable=False)  # 1, 2, ... per note
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    title = db.Column(db.String(200), nullable=False)
+    # Keyframes hold the full content, other revisions a delta against the previous one.
+    # Both are compressed blobs in the content_codec format.
+    is_keyframe = db.Column(db.Boolean, nullable=False, default=False)
+    data = deferred(db.Column(db.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql'), nullable=False))
+    content_length = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('note_id', 'number', name='unique_note_revision'),
+    )
+
+    note = db.relationship('Note', backref=db.backref('revisions', lazy=True, cascade='all, delete-orphan'))
+    user = db.relationship('User')
+
+    def to_dict(self):
+        return {
+            'number': self.number,
+            'note_id': self.note_id,
+            'title': self.title,
+            'content_length': self.content_length,
+            'user': self.user.to_dict() if self.user else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
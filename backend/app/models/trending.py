@@ -0,0 +1,28 @@
+from app import db
+from datetime import datetime
+
+
+class TrendingScore(db.Model):
+    """A note's decayed favorite score in one trending period (see app.services.trending)."""
+    __tablename__ = 'note_trending_scores'
+
+    note_id = db.Column(db.Integer, db.ForeignKey('notes.id'), primary_key=True)
+    period = db.Column(db.String(8), primary_key=True)  # '24h', '7d'
+    # Sum of 2 ** ((favorited_at - epoch) / half_life) over the period's favorites
+    score = db.Column(db.Double, nullable=False, default=0.0)
+
+    __table_args__ = (
+        # Trending feed: walked in order, so a page costs LIMIT rows however many notes have favorites
+        db.Index('ix_trending_period_score', 'period', 'score', 'note_id'),
+    )
+
+    note = db.relationship('Note', backref=db.backref('trending_scores', lazy=True, cascade='all, delete-orphan'))
+
+
+class TrendingWindow(db.Model):
+    """Scale reference of a period's scores, moved forward by every refresh."""
+    __tablename__ = 'trending_windows'
+
+    period = db.Column(db.String(8), primary_key=True)
+    epoch = db.Column(db.DateTime, nullable=False)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
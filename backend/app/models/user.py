@@ -1,6 +1,6 @@
 from app import db
+from app.services.passwords import password_hasher
 from datetime import datetime
-import bcrypt
 
 
 class User(db.Model):
@@ -19,29 +19,28 @@ class User(db.Model):
     favorites = db.relationship('Favorite', backref='user', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = bcrypt.hashpw(
-            password.encode('utf-8'), bcrypt.gensalt()
-        ).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.checkpw(
-            password.encode('utf-8'),
-            self.password_hash.encode('utf-8')
-        )
+        if not password_hasher.verify(password, self.password_hash):
+            return False
+        # Upgrade hashes made with an older work factor while we have the plaintext
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
 
     def set_security_answer(self, answer):
         if answer:
-            self.security_answer_hash = bcrypt.hashpw(
-                answer.strip().lower().encode('utf-8'), bcrypt.gensalt()
-            ).decode('utf-8')
+            self.security_answer_hash = password_hasher.hash(answer.strip().lower())
 
     def check_security_answer(self, answer):
         if not self.security_answer_hash or not answer:
             return False
-        return bcrypt.checkpw(
-            answer.strip().lower().encode('utf-8'),
-            self.security_answer_hash.encode('utf-8')
-        )
+        if not password_hasher.verify(answer.strip().lower(), self.security_answer_hash):
+            return False
+        if password_hasher.needs_rehash(self.security_answer_hash):
+            self.set_security_answer(answer)
+        return True
 
     def to_dict(self):
         return {
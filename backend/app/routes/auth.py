@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app import db
 from app.models.user import User
+from app.services.rate_limit import rate_limiter
 from app.utils import generate_token, token_required
 import jwt
 import os
@@ -86,11 +87,14 @@ def login():
     if not email or not password:
         return jsonify({'error': 'Email and password are required'}), 400
 
+    rate_limiter.check('login', account=email)
     user = User.query.filter_by(email=email).first()
 
     if not user or not user.check_password(password):
         return jsonify({'error': 'Invalid email or password'}), 401
 
+    db.session.commit()  # persist a rehash, if check_password upgraded the hash
+
     token = generate_token(user.id)
 
     return jsonify({
@@ -137,6 +141,7 @@ def verify_security_answer():
     if not email or not answer:
         return jsonify({'error': 'Email and security answer are required'}), 400
 
+    rate_limiter.check('verify_security_answer', account=email)
     user = User.query.filter_by(email=email).first()
     if not user:
         return jsonify({'error': 'Email tidak ditemukan'}), 404
@@ -144,6 +149,8 @@ def verify_security_answer():
     if not user.check_security_answer(answer):
         return jsonify({'error': 'Jawaban keamanan salah'}), 401
 
+    db.session.commit()  # persist a rehash, if any
+
     # Generate a short-lived reset token (15 min)
     secret = os.environ.get('JWT_SECRET_KEY', 'fallback-secret')
     reset_token = jwt.encode(
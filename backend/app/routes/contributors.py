@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import delete
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models.note import Note
 from app.models.user import User
 from app.models.contributor import NoteContributor
+from app.services import access_control
 from app.utils import token_required
 
 contributors_bp = Blueprint('contributors', __name__)
@@ -12,21 +14,20 @@ contributors_bp = Blueprint('contributors', __name__)
 @token_required
 def get_contributors(current_user_id, note_id):
     """Get all contributors for a note."""
-    note = Note.query.get(note_id)
-    if not note:
+    access = access_control.note_access(note_id, current_user_id)
+    if not access:
         return jsonify({'error': 'Note not found'}), 404
 
     # Only owner and contributors can see contributor list
-    is_owner = note.user_id == current_user_id
-    is_contributor = NoteContributor.query.filter_by(note_id=note_id, user_id=current_user_id).first() is not None
-
-    if not is_owner and not is_contributor:
+    if access.role not in access_control.EDITORS:
         return jsonify({'error': 'Unauthorized'}), 403
 
-    contributors = NoteContributor.query.filter_by(note_id=note_id).all()
+    contributors = NoteContributor.query.options(joinedload(NoteContributor.user))\
+        .filter_by(note_id=note_id)\
+        .all()
     return jsonify({
         'contributors': [c.to_dict() for c in contributors],
-        'is_owner': is_owner,
+        'is_owner': access.role == access_control.OWNER,
     }), 200
 
 
@@ -34,15 +35,15 @@ def get_contributors(current_user_id, note_id):
 @token_required
 def add_contributor(current_user_id, note_id):
     """Add a contributor to a note by email. Only the owner can do this."""
-    note = Note.query.get(note_id)
-    if not note:
+    access = access_control.note_access(note_id, current_user_id)
+    if not access:
         return jsonify({'error': 'Note not found'}), 404
 
-    if note.user_id != current_user_id:
+    if access.role != access_control.OWNER:
         return jsonify({'error': 'Hanya pemilik note yang bisa menambah contributor'}), 403
 
     # Only public and protected notes can have contributors
-    if note.visibility == 'private':
+    if access.visibility == 'private':
         return jsonify({'error': 'Note private tidak bisa memiliki contributor'}), 400
 
     data = request.get_json()
@@ -70,6 +71,7 @@ def add_contributor(current_user_id, note_id):
     contributor = NoteContributor(note_id=note_id, user_id=target_user.id)
     db.session.add(contributor)
     db.session.commit()
+    access_control.invalidate(note_id)
 
     return jsonify({
         'message': 'Contributor berhasil ditambahkan',
@@ -81,21 +83,24 @@ def add_contributor(current_user_id, note_id):
 @token_required
 def remove_contributor(current_user_id, note_id, user_id):
     """Remove a contributor from a note. Owner can remove anyone, contributor can remove themselves."""
-    note = Note.query.get(note_id)
-    if not note:
+    access = access_control.note_access(note_id, current_user_id)
+    if not access:
         return jsonify({'error': 'Note not found'}), 404
 
-    is_owner = note.user_id == current_user_id
+    is_owner = access.role == access_control.OWNER
     is_self = current_user_id == user_id
 
     if not is_owner and not is_self:
         return jsonify({'error': 'Unauthorized'}), 403
 
-    contributor = NoteContributor.query.filter_by(note_id=note_id, user_id=user_id).first()
-    if not contributor:
+    removed = db.session.execute(
+        delete(NoteContributor).where(NoteContributor.note_id == note_id, NoteContributor.user_id == user_id)
+    ).rowcount
+    if not removed:
+        db.session.rollback()
         return jsonify({'error': 'Contributor not found'}), 404
 
-    db.session.delete(contributor)
     db.session.commit()
+    access_control.invalidate(note_id)
 
     return jsonify({'message': 'Contributor berhasil dihapus'}), 200
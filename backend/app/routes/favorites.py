@@ -1,38 +1,49 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
 from app import db
 from app.models.favorite import Favorite
 from app.models.note import Note
+from app.services import trending
+from app.services.feed_cache import feed_cache
+from app.services.note_feed import load_notes, serialize_notes
 from app.utils import token_required
+from app.utils.validation import validate_batch, is_note_id
+from app.utils.pagination import paginate, InvalidCursor
+from app.utils.http_cache import note_rows, list_etag, not_modified, with_etag
 
 favorites_bp = Blueprint('favorites', __name__)
 
+BATCH_ATTEMPTS = 3
+
+
+class _ChangedConcurrently(Exception):
+    pass
+
 
 @favorites_bp.route('', methods=['GET'])
 @token_required
 def get_favorites(current_user_id):
     """Get all favorited notes by current user."""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    query = Favorite.query.filter_by(user_id=current_user_id)
 
-    query = Favorite.query.filter_by(user_id=current_user_id)\
-        .order_by(Favorite.created_at.desc())
+    try:
+        favorites, meta = paginate(query, (Favorite.created_at, Favorite.id),
+                                   key=lambda fav: (fav.created_at, fav.id))
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
 
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    note_ids = [fav.note_id for fav in favorites]
+    visible = [note for note in load_notes(note_ids) if note.visibility != 'private']
 
-    notes = []
-    for fav in pagination.items:
-        note = Note.query.get(fav.note_id)
-        if note and note.visibility != 'private':
-            note_data = note.to_dict(include_content=False, current_user_id=current_user_id)
-            note_data['is_favorited'] = True
-            notes.append(note_data)
+    etag = list_etag(note_rows(visible), note_ids, meta)
+    cached = not_modified(etag, weak=True)
+    if cached:
+        return cached
 
-    return jsonify({
-        'notes': notes,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page
-    }), 200
+    notes = serialize_notes(visible, current_user_id=current_user_id, favorited_ids=set(note_ids))
+
+    return with_etag(jsonify({'notes': notes, **meta}), etag, weak=True)
 
 
 @favorites_bp.route('/<int:note_id>', methods=['POST'])
@@ -47,12 +58,103 @@ def toggle_favorite(current_user_id, note_id):
         user_id=current_user_id, note_id=note_id
     ).first()
 
+    # Concurrent toggles of the same favorite (double clicks) must neither fail
+    # nor move the counter twice: the row delete/insert decides who wins
     if existing:
-        db.session.delete(existing)
+        removed = db.session.execute(delete(Favorite).where(Favorite.id == existing.id)).rowcount
+        if removed:
+            Note.adjust_favorite_count([note_id], -1)
+            trending.favorites_removed([(note_id, existing.created_at)])
         db.session.commit()
+    else:
+        try:
+            favorited_at = trending.favorited_now()
+            db.session.add(Favorite(user_id=current_user_id, note_id=note_id, created_at=favorited_at))
+            Note.adjust_favorite_count([note_id], 1)
+            trending.favorites_added([note_id], favorited_at)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # added by a concurrent request
+
+    if note.visibility != 'private':
+        feed_cache.invalidate_notes([note_id], favorites=True)
+
+    if existing:
         return jsonify({'message': 'Removed from favorites', 'is_favorited': False}), 200
+    return jsonify({'message': 'Added to favorites', 'is_favorited': True}), 200
+
+
+def _set_favorites(user_id, note_ids, favorite):
+    """Favorite or unfavorite ``note_ids`` and commit; return the ids that changed."""
+    already = dict(db.session.query(Favorite.note_id, Favorite.created_at).filter(
+        Favorite.user_id == user_id, Favorite.note_id.in_(note_ids)))
+
+    if favorite:
+        changed = [note_id for note_id in note_ids if note_id not in already]
+        if changed:
+            favorited_at = trending.favorited_now()
+            db.session.execute(insert(Favorite), [
+                {'user_id': user_id, 'note_id': note_id, 'created_at': favorited_at} for note_id in changed
+            ])
+            Note.adjust_favorite_count(changed, 1)
+            trending.favorites_added(changed, favorited_at)
     else:
-        fav = Favorite(user_id=current_user_id, note_id=note_id)
-        db.session.add(fav)
+        changed = [note_id for note_id in note_ids if note_id in already]
+        if changed:
+            removed = db.session.execute(delete(Favorite).where(
+                Favorite.user_id == user_id, Favorite.note_id.in_(changed))).rowcount
+            if removed != len(changed):
+                raise _ChangedConcurrently
+            Note.adjust_favorite_count(changed, -1)
+            trending.favorites_removed([(note_id, already[note_id]) for note_id in changed])
+
+    if changed:
         db.session.commit()
-        return jsonify({'message': 'Added to favorites', 'is_favorited': True}), 200
+    return changed
+
+
+@favorites_bp.route('/batch', methods=['POST'])
+@token_required
+def batch_set_favorites(current_user_id):
+    """Favorite (``favorite: true``) or unfavorite many notes in one transaction."""
+    data = request.get_json()
+    items, error = validate_batch(data, 'note_ids', current_app.config['BATCH_MAX_ITEMS'])
+    if error:
+        return jsonify({'error': error}), 400
+
+    favorite = data.get('favorite', True)
+    if not isinstance(favorite, bool):
+        return jsonify({'error': 'favorite must be true or false'}), 400
+
+    note_ids = list(dict.fromkeys(i for i in items if is_note_id(i)))
+    visibility = dict(db.session.query(Note.id, Note.visibility).filter(Note.id.in_(note_ids)).all())
+    existing_ids = [note_id for note_id in note_ids if note_id in visibility]
+
+    # A concurrent batch of the same user can commit between our read and write:
+    # the insert then hits the unique constraint, or the delete removes fewer rows
+    # than read. Both are redone from a fresh read rather than failing or
+    # moving the counters twice.
+    for _ in range(BATCH_ATTEMPTS):
+        try:
+            changed = _set_favorites(current_user_id, existing_ids, favorite)
+            break
+        except (IntegrityError, _ChangedConcurrently):
+            db.session.rollback()
+    else:
+        return jsonify({'error': 'Favorites were changed concurrently, try again'}), 409
+
+    if changed:
+        feed_cache.invalidate_notes(
+            [note_id for note_id in changed if visibility[note_id] != 'private'], favorites=True)
+
+    results = []
+    for item in items:
+        if not is_note_id(item):
+            results.append({'note_id': item, 'status': 400, 'error': 'Invalid note id'})
+        elif item not in visibility:
+            results.append({'note_id': item, 'status': 404, 'error': 'Note not found'})
+        else:
+            results.append({'note_id': item, 'status': 200, 'is_favorited': favorite})
+
+    return jsonify({'results': results, 'changed': len(changed)}), 200
+
@@ -1,10 +1,33 @@
-from flask import Blueprint, request, jsonify
+import zipfile
+from datetime import datetime
+
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
 from app import db
-from app.models.note import Note
+from app.models.note import Note, content_columns
 from app.models.user import User
 from app.models.favorite import Favorite
 from app.models.contributor import NoteContributor
+from app.models.revision import NoteRevision
+from app.models.trending import TrendingScore
+from app.services import access_control, trending
+from app.services.db_routing import use_primary
+from app.services.feed_cache import feed_cache
+from app.services.note_feed import feed_order, with_authors, serialize_notes, load_favorited_ids, load_notes
+from app.services.passwords import password_hasher
+from app.services.rate_limit import rate_limiter
+from app.services.revisions import record_edit
+from app.services.search import search_index
+from app.services.note_grants import issue_grant, has_valid_grant
+from app.services.note_export import export_ndjson, export_markdown_zip
+from app.services.note_import import FORMATS as IMPORT_FORMATS, ImportTooLarge, import_notes, insert_notes, read_upload
 from app.utils import token_required, optional_token
+from app.utils.validation import validate_note_data, validate_batch, is_note_id
+from app.utils.pagination import paginate, get_per_page, InvalidCursor
+from app.utils.http_cache import (
+    note_etag, note_rows, list_etag, not_modified, with_etag, if_match_fails,
+)
 
 notes_bp = Blueprint('notes', __name__)
 
@@ -12,114 +35,355 @@ notes_bp = Blueprint('notes', __name__)
 @notes_bp.route('', methods=['POST'])
 @token_required
 def create_note(current_user_id):
-    data = request.get_json()
+    fields, error = validate_note_data(request.get_json())
+    if error:
+        return jsonify({'error': error}), 400
 
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
+    note = _build_note(fields, current_user_id)
 
-    title = data.get('title', '').strip()
-    content = data.get('content', '').strip()
-    visibility = data.get('visibility', 'public')
-    password = data.get('password', None)
+    db.session.add(note)
+    db.session.flush()
+    search_index.index_notes([note])
+    db.session.commit()
 
-    if not title or not content:
-        return jsonify({'error': 'Title and content are required'}), 400
+    if note.visibility != 'private':
+        feed_cache.invalidate_listing()
+
+    return jsonify({
+        'message': 'Note created successfully',
+        'note': note.to_dict(current_user_id=current_user_id)
+    }), 201
 
-    if visibility not in ['public', 'private', 'protected']:
-        return jsonify({'error': 'Invalid visibility type'}), 400
 
-    if visibility == 'protected' and not password:
-        return jsonify({'error': 'Password is required for protected notes'}), 400
+def _note_row(fields, user_id, now):
+    """Column values of a new note, for bulk inserts."""
+    return {
+        'title': fields['title'],
+        'visibility': fields['visibility'],
+        'password_hash': password_hasher.hash(fields['password']) if fields['password'] else None,
+        'user_id': user_id,
+        'created_at': now,
+        'updated_at': now,
+        **content_columns(fields['content']),
+    }
 
+
+def _build_note(fields, user_id):
     note = Note(
-        title=title,
-        content=content,
-        visibility=visibility,
-        user_id=current_user_id
+        title=fields['title'],
+        content=fields['content'],
+        visibility=fields['visibility'],
+        user_id=user_id
     )
 
-    if visibility == 'protected' and password:
-        note.set_password(password)
+    if fields['password']:
+        note.set_password(fields['password'])
 
-    db.session.add(note)
-    db.session.commit()
+    return note
 
-    return jsonify({
-        'message': 'Note created successfully',
-        'note': note.to_dict(current_user_id=current_user_id)
-    }), 201
+
+@notes_bp.route('/batch', methods=['POST'])
+@token_required
+def batch_create_notes(current_user_id):
+    """Create many notes in one transaction. Invalid items are reported, valid ones are created."""
+    items, error = validate_batch(request.get_json(), 'notes', current_app.config['BATCH_MAX_ITEMS'])
+    if error:
+        return jsonify({'error': error}), 400
+
+    results = [None] * len(items)
+    created = []
+    for index, item in enumerate(items):
+        fields, item_error = validate_note_data(item)
+        if item_error:
+            results[index] = {'index': index, 'status': 400, 'error': item_error}
+        else:
+            created.append((index, fields))
+
+    # Every protected note is a bcrypt hash run in this request
+    max_protected = current_app.config['MAX_PROTECTED_PER_REQUEST']
+    if sum(1 for _, fields in created if fields['password']) > max_protected:
+        return jsonify({'error': f'At most {max_protected} protected notes per batch'}), 400
+
+    if created:
+        now = datetime.utcnow()
+        rows = [_note_row(fields, current_user_id, now) for _, fields in created]
+        ids = insert_notes(rows, [fields['content'] for _, fields in created], current_user_id)
+        db.session.commit()
+
+        if any(fields['visibility'] != 'private' for _, fields in created):
+            feed_cache.invalidate_listing()
+
+        # One reload for ids, timestamps and authors; content comes from the request
+        notes = {note.id: note for note in load_notes([note_id for note_id in ids if note_id is not None])}
+        for (index, fields), note_id in zip(created, ids):
+            note_data = notes[note_id].to_dict(include_content=False, current_user_id=current_user_id)
+            if fields['visibility'] != 'protected':
+                note_data['content'] = fields['content']
+            results[index] = {'index': index, 'status': 201, 'note': note_data}
+
+    return jsonify({'results': results, 'created': len(created)}), 200
+
+
+@notes_bp.route('/batch-delete', methods=['POST'])
+@token_required
+def batch_delete_notes(current_user_id):
+    """Delete many notes in one transaction. Only the owner may delete a note."""
+    items, error = validate_batch(request.get_json(), 'ids', current_app.config['BATCH_MAX_ITEMS'])
+    if error:
+        return jsonify({'error': error}), 400
+
+    note_ids = list(dict.fromkeys(i for i in items if is_note_id(i)))
+    owned = db.session.query(Note.id, Note.user_id, Note.visibility)\
+        .filter(Note.id.in_(note_ids)).all()
+    found = {note_id: (user_id, visibility) for note_id, user_id, visibility in owned}
+
+    results = []
+    deletable = []
+    for item in items:
+        if not is_note_id(item):
+            results.append({'id': item, 'status': 400, 'error': 'Invalid note id'})
+        elif item not in found:
+            results.append({'id': item, 'status': 404, 'error': 'Note not found'})
+        elif found[item][0] != current_user_id:
+            results.append({'id': item, 'status': 403, 'error': 'Unauthorized'})
+        else:
+            results.append({'id': item, 'status': 200})
+            if item not in deletable:
+                deletable.append(item)
+
+    if deletable:
+        # Bulk statements bypass ORM cascades, so remove dependent rows explicitly
+        db.session.execute(delete(Favorite).where(Favorite.note_id.in_(deletable)))
+        db.session.execute(delete(NoteContributor).where(NoteContributor.note_id.in_(deletable)))
+        db.session.execute(delete(NoteRevision).where(NoteRevision.note_id.in_(deletable)))
+        db.session.execute(delete(TrendingScore).where(TrendingScore.note_id.in_(deletable)))
+        db.session.execute(delete(Note).where(Note.id.in_(deletable)))
+        search_index.remove_notes(deletable)
+        db.session.commit()
+        access_control.invalidate(*deletable)
+
+        if any(found[note_id][1] != 'private' for note_id in deletable):
+            feed_cache.invalidate_listing()
+
+    return jsonify({'results': results, 'deleted': len(deletable)}), 200
+
+
+def _explore_cache_key(current_user_id):
+    """Cache key for an explore request, or None when the page should not be cached.
+
+    Anonymous pages are shared by everyone; for logged-in users only the first
+    page is worth caching.
+    """
+    args = request.args
+    first_page = args.get('cursor', '') == '' and args.get('page', 1, type=int) == 1
+    if current_user_id and not first_page:
+        return None
+
+    return 'explore:' + '&'.join([
+        f"page={args.get('page', 1, type=int)}",
+        f'per_page={get_per_page()}',
+        f"search={args.get('search', '', type=str).strip().lower()}",
+        f"sort={args.get('sort', 'recent', type=str)}",
+        f"cursor={args.get('cursor', type=str)}",
+        f"include_total={args.get('include_total', 0, type=int)}",
+    ])
 
 
 @notes_bp.route('', methods=['GET'])
 @optional_token
 def get_notes(current_user_id):
     """Get all public notes (explore page)."""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     search = request.args.get('search', '', type=str).strip()
+    sort = request.args.get('sort', 'recent', type=str)
 
-    query = Note.query.filter(Note.visibility.in_(['public', 'protected']))
+    cache_key = _explore_cache_key(current_user_id)
+    body = feed_cache.get(cache_key) if cache_key else None
 
-    if search:
-        query = query.filter(Note.title.ilike(f'%{search}%'))
-
-    query = query.order_by(Note.created_at.desc())
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-
-    notes = []
-    for note in pagination.items:
-        note_data = note.to_dict(include_content=False, current_user_id=current_user_id)
-        # Check if current user has favorited this note
-        if current_user_id:
-            fav = Favorite.query.filter_by(user_id=current_user_id, note_id=note.id).first()
-            note_data['is_favorited'] = fav is not None
-        else:
-            note_data['is_favorited'] = False
-        notes.append(note_data)
+    if body is None:
+        started = feed_cache.begin()
+        if cache_key:
+            # A lagging replica could put a page from before the last invalidation
+            # back into the cache for a whole TTL; misses are rare enough for the primary
+            use_primary()
+        query = Note.query.filter(Note.visibility.in_(['public', 'protected']))
 
-    return jsonify({
-        'notes': notes,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page
-    }), 200
+        if search:
+            # Protected notes are listed here without their content, so they may only match by title.
+            # Cursor pages follow recency order, so relevance ranking only applies to offset pages.
+            query = search_index.filter(query, search, content_visible=Note.visibility == 'public',
+                                        rank='cursor' not in request.args)
+
+        columns, key = feed_order(sort)
+        try:
+            items, meta = paginate(with_authors(query), columns, key=key)
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        # The shared body carries no per-user state; is_favorited is overlaid below
+        body = {'notes': serialize_notes(items, favorited_ids=set()), **meta}
+        if cache_key:
+            feed_cache.set(cache_key, body, started, search=bool(search), popular=sort == 'popular')
+
+    favorited_ids = load_favorited_ids(current_user_id, [note['id'] for note in body['notes']])
+    rows = [(note['id'], note['updated_at'], note['favorite_count']) for note in body['notes']]
+    etag = list_etag(rows, favorited_ids, {k: v for k, v in body.items() if k != 'notes'})
+    cached = not_modified(etag, weak=True)
+    if cached:
+        return cached
+
+    notes = [{**note, 'is_favorited': note['id'] in favorited_ids} for note in body['notes']]
+
+    return with_etag(jsonify({**body, 'notes': notes}), etag, weak=True)
 
 
 @notes_bp.route('/my', methods=['GET'])
 @token_required
 def get_my_notes(current_user_id):
     """Get all notes by current user."""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     search = request.args.get('search', '', type=str).strip()
 
     query = Note.query.filter_by(user_id=current_user_id)
 
     if search:
-        query = query.filter(Note.title.ilike(f'%{search}%'))
+        query = search_index.filter(query, search, content_visible=db.true(),
+                                    rank='cursor' not in request.args)
 
-    query = query.order_by(Note.created_at.desc())
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    columns, key = feed_order(request.args.get('sort', 'recent', type=str))
+    try:
+        items, meta = paginate(with_authors(query), columns, key=key)
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
 
-    notes = []
-    for note in pagination.items:
-        note_data = note.to_dict(include_content=False, current_user_id=current_user_id)
-        fav = Favorite.query.filter_by(user_id=current_user_id, note_id=note.id).first()
-        note_data['is_favorited'] = fav is not None
-        notes.append(note_data)
+    favorited_ids = load_favorited_ids(current_user_id, [note.id for note in items])
+    etag = list_etag(note_rows(items), favorited_ids, meta)
+    cached = not_modified(etag, weak=True)
+    if cached:
+        return cached
 
-    return jsonify({
-        'notes': notes,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page
-    }), 200
+    notes = serialize_notes(items, current_user_id=current_user_id, favorited_ids=favorited_ids)
+
+    return with_etag(jsonify({'notes': notes, **meta}), etag, weak=True)
+
+
+@notes_bp.route('/shared', methods=['GET'])
+@token_required
+def get_shared_notes(current_user_id):
+    """Get notes the current user was added to as a contributor, most recently shared first."""
+    # Private notes stay with their owner, even for contributors
+    query = with_authors(db.session.query(Note, NoteContributor.created_at, NoteContributor.id))\
+        .join(NoteContributor, NoteContributor.note_id == Note.id)\
+        .filter(NoteContributor.user_id == current_user_id, Note.visibility != 'private')
+
+    try:
+        rows, meta = paginate(query, (NoteContributor.created_at, NoteContributor.id),
+                              key=lambda row: (row[1], row[2]))
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    items = [row[0] for row in rows]
+    favorited_ids = load_favorited_ids(current_user_id, [note.id for note in items])
+    etag = list_etag(note_rows(items), favorited_ids, meta)
+    cached = not_modified(etag, weak=True)
+    if cached:
+        return cached
+
+    notes = serialize_notes(items, current_user_id=current_user_id, favorited_ids=favorited_ids)
+
+    return with_etag(jsonify({'notes': notes, **meta}), etag, weak=True)
+
+
+@notes_bp.route('/trending', methods=['GET'])
+@optional_token
+def get_trending_notes(current_user_id):
+    """Get public notes ranked by recent favorites (``window``: 24h, 7d or all)."""
+    window = request.args.get('window', '24h', type=str)
+    if window not in trending.WINDOWS:
+        return jsonify({'error': f"window must be one of: {', '.join(trending.WINDOWS)}"}), 400
+
+    try:
+        if window == 'all':
+            query = Note.query.filter(Note.visibility.in_(['public', 'protected']), Note.favorite_count > 0)
+            columns, key = feed_order('popular')
+            items, meta = paginate(with_authors(query), columns, key=key)
+        else:
+            rows, meta = paginate(with_authors(trending.feed_query(window)),
+                                  (TrendingScore.score, TrendingScore.note_id),
+                                  key=lambda row: (row[1], row[0].id))
+            items = [row[0] for row in rows]
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    favorited_ids = load_favorited_ids(current_user_id, [note.id for note in items])
+    etag = list_etag(note_rows(items), favorited_ids, meta)
+    cached = not_modified(etag, weak=True)
+    if cached:
+        return cached
+
+    notes = serialize_notes(items, current_user_id=current_user_id, favorited_ids=favorited_ids)
+
+    return with_etag(jsonify({'notes': notes, 'window': window, **meta}), etag, weak=True)
+
+
+@notes_bp.route('/export', methods=['GET'])
+@token_required
+def export_notes(current_user_id):
+    """Stream all of the user's notes as NDJSON (default) or as a zip of Markdown files."""
+    export_format = request.args.get('format', 'ndjson', type=str)
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+
+    if export_format == 'ndjson':
+        body = export_ndjson(current_user_id, batch_size)
+        mimetype, filename = 'application/x-ndjson', 'notes.ndjson'
+    elif export_format == 'zip':
+        body = export_markdown_zip(current_user_id, batch_size)
+        mimetype, filename = 'application/zip', 'notes.zip'
+    else:
+        return jsonify({'error': 'Invalid export format'}), 400
+
+    # No Content-Length: the response is sent chunked as the generator yields
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@notes_bp.route('/import', methods=['POST'])
+@token_required
+def import_notes_upload(current_user_id):
+    """Bulk import an uploaded NDJSON file or zip of Markdown files (multipart field ``file``)."""
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'error': 'No file provided'}), 400
+
+    default_format = 'zip' if (upload.filename or '').lower().endswith('.zip') else 'ndjson'
+    import_format = request.args.get('format', default_format, type=str)
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({'error': 'Invalid import format'}), 400
+
+    try:
+        result = import_notes(
+            read_upload(upload.stream, import_format,
+                        max_file_size=current_app.config['IMPORT_ZIP_MAX_FILE_SIZE'],
+                        max_total_size=current_app.config['IMPORT_ZIP_MAX_TOTAL_SIZE']),
+            current_user_id,
+            batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+            max_protected=current_app.config['MAX_PROTECTED_PER_REQUEST'],
+        )
+    except zipfile.BadZipFile:
+        db.session.rollback()
+        return jsonify({'error': 'Invalid zip archive'}), 400
+    except ImportTooLarge as exc:
+        db.session.rollback()
+        return jsonify({'error': str(exc)}), 413
+
+    return jsonify(result.to_dict()), 200
 
 
 @notes_bp.route('/<int:note_id>', methods=['GET'])
 @optional_token
 def get_note(current_user_id, note_id):
-    note = Note.query.get(note_id)
+    # Content is deferred: only loaded once we know the client's copy is stale
+    note = with_authors(Note.query).filter(Note.id == note_id).first()
     if not note:
         return jsonify({'error': 'Note not found'}), 404
 
@@ -127,21 +391,28 @@ def get_note(current_user_id, note_id):
     if note.visibility == 'private' and note.user_id != current_user_id:
         return jsonify({'error': 'This note is private'}), 403
 
-    note_data = note.to_dict(current_user_id=current_user_id)
+    favorited_ids = load_favorited_ids(current_user_id, [note.id])
+    # Protected note — content only with a grant from a recent verify-password
+    unlocked = note.visibility == 'protected' and has_valid_grant(note)
 
-    if current_user_id:
-        fav = Favorite.query.filter_by(user_id=current_user_id, note_id=note.id).first()
-        note_data['is_favorited'] = fav is not None
-    else:
-        note_data['is_favorited'] = False
+    etag = note_etag(note, note.id in favorited_ids, unlocked)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    note_data = serialize_notes([note], current_user_id=current_user_id, include_content=True,
+                                favorited_ids=favorited_ids)[0]
+    if unlocked:
+        note_data['content'] = note.content
 
-    return jsonify({'note': note_data}), 200
+    return with_etag(jsonify({'note': note_data}), etag)
 
 
 @notes_bp.route('/<int:note_id>/verify-password', methods=['POST'])
 @optional_token
 def verify_note_password(current_user_id, note_id):
     """Verify password for a protected note. Everyone must enter password, including the owner."""
+    rate_limiter.check('verify_note_password', note_id=note_id)
     note = Note.query.get(note_id)
     if not note:
         return jsonify({'error': 'Note not found'}), 404
@@ -156,9 +427,16 @@ def verify_note_password(current_user_id, note_id):
         return jsonify({'error': 'Password is required'}), 400
 
     if note.check_password(password):
+        db.session.commit()  # persist a rehash, if any
         note_data = note.to_dict(current_user_id=current_user_id)
         note_data['content'] = note.content  # Override — password verified
-        return jsonify({'verified': True, 'note': note_data}), 200
+        grant, expires_in = issue_grant(note)
+        return jsonify({
+            'verified': True,
+            'note': note_data,
+            'access_grant': grant,
+            'grant_expires_in': expires_in,
+        }), 200
     else:
         return jsonify({'verified': False, 'error': 'Incorrect password'}), 401
 
@@ -166,19 +444,29 @@ def verify_note_password(current_user_id, note_id):
 @notes_bp.route('/<int:note_id>', methods=['PUT'])
 @token_required
 def update_note(current_user_id, note_id):
-    note = Note.query.get(note_id)
+    note, access = access_control.load_note(note_id, current_user_id)
     if not note:
         return jsonify({'error': 'Note not found'}), 404
 
-    if note.user_id != current_user_id:
-        # Check if user is a contributor
-        is_contributor = NoteContributor.query.filter_by(note_id=note_id, user_id=current_user_id).first() is not None
-        if not is_contributor:
-            return jsonify({'error': 'Unauthorized'}), 403
+    # Owner or contributor
+    if access.role not in access_control.EDITORS:
+        return jsonify({'error': 'Unauthorized'}), 403
 
-    is_owner = note.user_id == current_user_id
+    # Optimistic concurrency: refuse to overwrite an edit the client has not seen
+    if if_match_fails(note):
+        return jsonify({
+            'error': 'Note telah diubah oleh orang lain, muat ulang sebelum menyimpan',
+            'error_type': 'conflict',
+        }), 412
+
+    is_owner = access.role == access_control.OWNER
+    old_visibility = note.visibility
     data = request.get_json()
 
+    # The version being replaced, for the revision history
+    old_title = note.title
+    old_content = note.content if 'title' in data or 'content' in data else None
+
     if 'title' in data:
         note.title = data['title'].strip()
     if 'content' in data:
@@ -225,12 +513,32 @@ def update_note(current_user_id, note_id):
         return jsonify({'error': 'Password harus diisi untuk note protected'}), 400
 
     note.visibility = new_visibility
-    db.session.commit()
-
-    return jsonify({
+    if old_content is not None and (note.title, note.content) != (old_title, old_content):
+        record_edit(note, old_title, old_content, current_user_id)
+    search_index.index_notes([note])
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another edit took the same revision number first
+        db.session.rollback()
+        return jsonify({
+            'error': 'Note telah diubah oleh orang lain, muat ulang sebelum menyimpan',
+            'error_type': 'conflict',
+        }), 409
+    if old_visibility != new_visibility:
+        access_control.invalidate(note.id)
+
+    if old_visibility != new_visibility and 'private' in (old_visibility, new_visibility):
+        feed_cache.invalidate_listing()
+    elif new_visibility != 'private':
+        feed_cache.invalidate_notes([note.id])
+
+    favorited_ids = load_favorited_ids(current_user_id, [note.id])
+    response = jsonify({
         'message': 'Note updated successfully',
         'note': note.to_dict(current_user_id=current_user_id)
-    }), 200
+    })
+    return with_etag(response, note_etag(note, note.id in favorited_ids, False)), 200
 
 
 @notes_bp.route('/<int:note_id>', methods=['DELETE'])
@@ -243,7 +551,13 @@ def delete_note(current_user_id, note_id):
     if note.user_id != current_user_id:
         return jsonify({'error': 'Unauthorized'}), 403
 
+    was_listed = note.visibility != 'private'
+    search_index.remove_notes([note.id])
     db.session.delete(note)
     db.session.commit()
+    access_control.invalidate(note_id)
+
+    if was_listed:
+        feed_cache.invalidate_listing()
 
     return jsonify({'message': 'Note deleted successfully'}), 200
@@ -0,0 +1,63 @@
+from flask import Blueprint, jsonify
+from sqlalchemy.orm import joinedload
+from app.models.note import Note
+from app.models.revision import NoteRevision
+from app.services import access_control
+from app.services.note_grants import has_valid_grant
+from app.services.revisions import revision_content
+from app.utils import token_required
+from app.utils.pagination import paginate, InvalidCursor
+
+revisions_bp = Blueprint('revisions', __name__)
+
+
+def _history_access(current_user_id, note_id):
+    """Return (access, error response); only owner and contributors may see the history."""
+    access = access_control.note_access(note_id, current_user_id)
+    if not access:
+        return None, (jsonify({'error': 'Note not found'}), 404)
+    if access.role not in access_control.EDITORS:
+        return None, (jsonify({'error': 'Unauthorized'}), 403)
+    # Private note — only author can view, as for the note itself
+    if access.visibility == 'private' and access.role != access_control.OWNER:
+        return None, (jsonify({'error': 'This note is private'}), 403)
+    return access, None
+
+
+@revisions_bp.route('/<int:note_id>/revisions', methods=['GET'])
+@token_required
+def get_revisions(current_user_id, note_id):
+    """List a note's revisions, newest first (titles and metadata, no content)."""
+    _, error = _history_access(current_user_id, note_id)
+    if error:
+        return error
+
+    query = NoteRevision.query.options(joinedload(NoteRevision.user)).filter_by(note_id=note_id)
+    try:
+        revisions, meta = paginate(query, (NoteRevision.number,), key=lambda revision: (revision.number,))
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    return jsonify({'revisions': [revision.to_dict() for revision in revisions], **meta}), 200
+
+
+@revisions_bp.route('/<int:note_id>/revisions/<int:number>', methods=['GET'])
+@token_required
+def get_revision(current_user_id, note_id, number):
+    """Get one revision with its full content."""
+    access, error = _history_access(current_user_id, note_id)
+    if error:
+        return error
+
+    revision = NoteRevision.query.options(joinedload(NoteRevision.user))\
+        .filter_by(note_id=note_id, number=number).first()
+    if not revision:
+        return jsonify({'error': 'Revision not found'}), 404
+
+    # Protected note — same rule as reading the note itself: a grant from verify-password
+    if access.visibility == 'protected' and not has_valid_grant(Note.query.get(note_id)):
+        return jsonify({'error': 'Password required', 'error_type': 'password_required'}), 403
+
+    revision_data = revision.to_dict()
+    revision_data['content'] = revision_content(note_id, number)
+    return jsonify({'revision': revision_data}), 200
@@ -0,0 +1,171 @@
+"""Who may do what to a note: one query, cached per request and briefly across requests.
+
+``note_access(note_id, user_id)`` resolves the caller's role with a single
+``notes LEFT JOIN note_contributors`` lookup (``load_note`` does the same
+while loading the note itself):
+
+- ``owner``: wrote the note;
+- ``contributor``: listed in ``note_contributors``, may edit;
+- ``reader``: anyone else on a public or protected note;
+- ``none``: anyone else on a private note.
+
+The answer is kept in ``g`` for the rest of the request and in a small
+per-process cache for ``ACCESS_CACHE_TTL`` seconds. Adding or removing a
+contributor, changing visibility and deleting a note call ``invalidate``,
+which clears both. Other gunicorn workers may act on the old answer until
+their entry expires, so keep the TTL short (``0`` disables the cache).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import and_, select
+
+OWNER = 'owner'
+CONTRIBUTOR = 'contributor'
+READER = 'reader'
+NONE = 'none'
+EDITORS = (OWNER, CONTRIBUTOR)
+
+NoteAccess = namedtuple('NoteAccess', 'role owner_id visibility')
+
+
+class AccessCache:
+    """Per-process ``(note_id, user_id) -> NoteAccess`` entries, grouped by note for invalidation."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._notes = OrderedDict()  # note_id -> {user_id: (access, expires_at)}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, note_id, user_id):
+        with self._lock:
+            entries = self._notes.get(note_id)
+            entry = entries.get(user_id) if entries else None
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del entries[user_id]
+                self._size -= 1
+                return None
+            self._notes.move_to_end(note_id)
+            return entry[0]
+
+    def set(self, note_id, user_id, access, ttl):
+        with self._lock:
+            entries = self._notes.setdefault(note_id, {})
+            self._size += user_id not in entries
+            entries[user_id] = (access, time.monotonic() + ttl)
+            self._notes.move_to_end(note_id)
+            while self._size > self.maxsize and len(self._notes) > 1:
+                _, dropped = self._notes.popitem(last=False)
+                self._size -= len(dropped)
+
+    def invalidate(self, note_ids):
+        with self._lock:
+            for note_id in note_ids:
+                self._size -= len(self._notes.pop(note_id, ()))
+
+
+def init_app(app):
+    app.config.setdefault('ACCESS_CACHE_TTL', float(os.getenv('ACCESS_CACHE_TTL', 5)))
+    app.config.setdefault('ACCESS_CACHE_SIZE', int(os.getenv('ACCESS_CACHE_SIZE', 4096)))
+    app.extensions['access_cache'] = AccessCache(maxsize=app.config['ACCESS_CACHE_SIZE'])
+
+
+def _request_cache():
+    if not has_request_context():
+        return None
+    if 'note_access' not in g:
+        g.note_access = {}
+    return g.note_access
+
+
+def _access(owner_id, visibility, contribution_id, user_id):
+    if user_id is not None and owner_id == user_id:
+        role = OWNER
+    elif contribution_id is not None:
+        role = CONTRIBUTOR
+    elif visibility != 'private':
+        role = READER
+    else:
+        role = NONE
+    return NoteAccess(role, owner_id, visibility)
+
+
+def _with_contribution(query, user_id):
+    from app.models.contributor import NoteContributor
+    from app.models.note import Note
+
+    return query.outerjoin(NoteContributor, and_(NoteContributor.note_id == Note.id,
+                                                 NoteContributor.user_id == user_id))
+
+
+def _remember(note_id, user_id, access):
+    ttl = current_app.config['ACCESS_CACHE_TTL']
+    # Missing notes are not cached: the id may be created a moment later
+    if access is not None and ttl > 0:
+        current_app.extensions['access_cache'].set(note_id, user_id, access, ttl)
+    per_request = _request_cache()
+    if per_request is not None:
+        per_request[(note_id, user_id)] = access
+
+
+def note_access(note_id, user_id):
+    """The caller's ``NoteAccess`` on a note, or None if the note does not exist."""
+    from app import db
+    from app.models.contributor import NoteContributor
+    from app.models.note import Note
+
+    per_request = _request_cache()
+    if per_request is not None and (note_id, user_id) in per_request:
+        return per_request[(note_id, user_id)]
+
+    if current_app.config['ACCESS_CACHE_TTL'] > 0:
+        access = current_app.extensions['access_cache'].get(note_id, user_id)
+        if access is not None:
+            if per_request is not None:
+                per_request[(note_id, user_id)] = access
+            return access
+
+    row = db.session.execute(
+        _with_contribution(select(Note.user_id, Note.visibility, NoteContributor.id), user_id)
+        .where(Note.id == note_id)
+    ).first()
+    access = _access(*row, user_id) if row is not None else None
+    _remember(note_id, user_id, access)
+    return access
+
+
+def load_note(note_id, user_id):
+    """Return (note, access) with one query, for handlers that go on to change the note.
+
+    Both are None when the note does not exist. The access is cached like
+    ``note_access``.
+    """
+    from app import db
+    from app.models.contributor import NoteContributor
+    from app.models.note import Note
+
+    row = db.session.execute(
+        _with_contribution(select(Note, NoteContributor.id), user_id).where(Note.id == note_id)
+    ).first()
+    if row is None:
+        _remember(note_id, user_id, None)
+        return None, None
+    note, contribution_id = row
+    access = _access(note.user_id, note.visibility, contribution_id, user_id)
+    _remember(note_id, user_id, access)
+    return note, access
+
+
+def invalidate(*note_ids):
+    """Forget cached roles for these notes (contributors or visibility changed, note deleted)."""
+    current_app.extensions['access_cache'].invalidate(note_ids)
+    per_request = _request_cache()
+    if per_request:
+        for key in [key for key in per_request if key[0] in note_ids]:
+            del per_request[key]
@@ -0,0 +1,88 @@
+"""Optional compressed storage for large note bodies.
+
+Bodies of at least ``NOTE_COMPRESSION_THRESHOLD`` bytes (UTF-8) are stored in
+``notes.content_compressed`` instead of ``notes.content``. The blob starts with
+a one-byte format marker so codecs can be mixed and changed over time:
+
+    b'z' + zlib stream
+    b's' + zstd frame   (needs the optional ``zstandard`` package)
+
+A threshold of 0 (the default) disables compression for new writes; rows that
+are already compressed are still read back transparently. Compressed bodies
+are not covered by the MySQL FULLTEXT index on ``content``, so the app
+refuses to start with compression enabled while that search backend is in
+use (see ``search.searches_content_column``), and ``compress-content``
+refuses to run.
+"""
+import os
+import zlib
+
+from flask import current_app
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+ZLIB = b'z'
+ZSTD = b's'
+CODECS = ('zlib', 'zstd')
+
+
+def init_app(app):
+    app.config.setdefault('NOTE_COMPRESSION_THRESHOLD', int(os.getenv('NOTE_COMPRESSION_THRESHOLD', 0)))
+    app.config.setdefault('NOTE_COMPRESSION_CODEC', os.getenv('NOTE_COMPRESSION_CODEC', 'zlib'))
+    app.config.setdefault('NOTE_COMPRESSION_LEVEL', int(os.getenv('NOTE_COMPRESSION_LEVEL', 6)))
+
+    codec = app.config['NOTE_COMPRESSION_CODEC']
+    if codec not in CODECS:
+        raise ValueError(f'Unknown NOTE_COMPRESSION_CODEC: {codec}')
+    if codec == 'zstd' and zstandard is None:
+        raise RuntimeError('NOTE_COMPRESSION_CODEC=zstd requires the zstandard package')
+
+
+def compress(data, codec='zlib', level=6):
+    """Return the marked blob for ``data`` (bytes)."""
+    if codec == 'zstd':
+        return ZSTD + zstandard.ZstdCompressor(level=level).compress(data)
+    return ZLIB + zlib.compress(data, level)
+
+
+def decompress(blob):
+    """Return the text stored in a marked blob."""
+    blob = bytes(blob)
+    marker, payload = blob[:1], blob[1:]
+    if marker == ZLIB:
+        data = zlib.decompress(payload)
+    elif marker == ZSTD:
+        if zstandard is None:
+            raise RuntimeError('Note content is zstd-compressed but zstandard is not installed')
+        data = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        raise ValueError(f'Unknown content compression marker: {marker!r}')
+    return data.decode('utf-8')
+
+
+def encode_content(content, threshold=None, codec=None, level=None):
+    """Return ``(text, blob)`` for the two storage columns.
+
+    Settings default to the app config. Bodies below the threshold, or that
+    do not get smaller, are stored as plain text with no blob.
+    """
+    config = current_app.config
+    threshold = config['NOTE_COMPRESSION_THRESHOLD'] if threshold is None else threshold
+    if not threshold:
+        return content, None
+
+    data = content.encode('utf-8')
+    if len(data) < threshold:
+        return content, None
+
+    blob = compress(
+        data,
+        codec or config['NOTE_COMPRESSION_CODEC'],
+        config['NOTE_COMPRESSION_LEVEL'] if level is None else level,
+    )
+    if len(blob) >= len(data):
+        return content, None
+    return '', blob
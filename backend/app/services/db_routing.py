@@ -0,0 +1,109 @@
+"""Engine pool settings and read/write routing to an optional read replica.
+
+When ``DATABASE_REPLICA_URL`` is set it is registered as the ``replica`` bind.
+Sessions opened while handling a ``GET``/``HEAD`` request send their queries
+there; everything else (other methods, CLI commands, flushes) uses the
+primary. Once a session has flushed a write it stays on the primary until the
+end of the request, so a handler always reads its own writes.
+
+A replica may lag behind the primary, so a client could miss a write it
+made in a previous request (a ``GET`` right after ``PUT /api/notes/<id>``).
+A request that wrote answers with ``X-Primary-Until``: a Unix time
+``DB_PRIMARY_STICKY_SECONDS`` ahead. Clients echo it back as a request
+header, and their reads go to the primary until then. The header lives with
+the client rather than in a worker, so it holds whichever worker serves the
+next request; a value further ahead than the window is ignored. Handlers that
+must always see fresh data on ``GET`` call ``use_primary()`` before querying.
+"""
+import os
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+PRIMARY_PINNED = 'primary_pinned'
+WROTE = 'wrote'
+PRIMARY_UNTIL_HEADER = 'X-Primary-Until'
+
+
+def init_app(app):
+    app.config.setdefault('DB_PRIMARY_STICKY_SECONDS', float(os.getenv('DB_PRIMARY_STICKY_SECONDS', 5)))
+    app.after_request(_stick_after_write)
+
+
+def engine_options(database_uri):
+    """Pool settings for ``SQLALCHEMY_ENGINE_OPTIONS``, read from the environment.
+
+    Pools are per worker process: a deploy opens at most
+    workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections to each database.
+    The defaults match the 4 request threads per worker set in ``gunicorn.conf.py``
+    (``GUNICORN_THREADS``).
+    """
+    options = {
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1',
+        # Below MySQL's wait_timeout and typical proxy idle timeouts
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 280)),
+    }
+    if database_uri and not database_uri.startswith('sqlite'):
+        options.update({
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 4)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 4)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        })
+    return options
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that reads from the replica bind on GET requests."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica():
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self):
+        return (
+            not self._flushing
+            and not self.info.get(PRIMARY_PINNED)
+            and has_request_context()
+            and request.method in READ_METHODS
+            and not _client_wrote_recently()
+        )
+
+
+def _client_wrote_recently():
+    """Whether the request carries an ``X-Primary-Until`` that has not passed yet."""
+    if 'primary_until' not in g:
+        try:
+            g.primary_until = float(request.headers.get(PRIMARY_UNTIL_HEADER, 0))
+        except ValueError:
+            g.primary_until = 0.0
+    now = time.time()
+    return now < g.primary_until <= now + current_app.config['DB_PRIMARY_STICKY_SECONDS']
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _pin_after_write(session, flush_context):
+    session.info[PRIMARY_PINNED] = True
+    session.info[WROTE] = True
+
+
+def _stick_after_write(response):
+    from app import db
+    if response.status_code < 400 and db.session().info.get(WROTE):
+        until = time.time() + current_app.config['DB_PRIMARY_STICKY_SECONDS']
+        response.headers[PRIMARY_UNTIL_HEADER] = f'{until:.3f}'
+    return response
+
+
+def use_primary(session=None):
+    """Route the rest of this request's queries to the primary."""
+    if session is None:
+        from app import db
+        session = db.session
+    session.info[PRIMARY_PINNED] = True
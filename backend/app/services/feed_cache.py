@@ -0,0 +1,165 @@
+"""Response cache for the explore feed (``GET /api/notes``).
+
+Only the shared part of a page is cached: the serialized notes without the
+per-user ``is_favorited`` flag, plus the pagination fields. Logged-in callers
+get their flags overlaid on a copy with one ``IN (...)`` query.
+
+Invalidation is tag based. Every entry is tagged with ``explore``, with
+``note:<id>`` for each note on the page, and with ``search``/``popular`` when
+the request searched or sorted by favorites. Writes bump only the tags they
+affect. An entry is valid only if none of its tags was bumped after the entry
+started computing, so a write that commits while a page is being built can
+never leave a stale page behind.
+
+The default backend lives in process memory, so a write only clears the
+cache of the worker that served it; other workers catch up within
+``FEED_CACHE_TTL`` seconds. Pages that will be cached are read from the
+primary database, never a replica, so replication lag cannot refill the
+cache with a page from before an invalidation. A backend shared by all
+workers on a host can be plugged in through ``FEED_CACHE_BACKEND`` by
+implementing ``FeedCacheBackend``.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from werkzeug.utils import import_string
+
+
+class FeedCacheBackend:
+    """Storage interface for the feed cache."""
+
+    def begin(self):
+        """Return a token identifying "now"; pass it to ``set`` for a page computed after this call."""
+        raise NotImplementedError
+
+    def get(self, key):
+        """Return a cached value, or None if missing, expired or invalidated."""
+        raise NotImplementedError
+
+    def set(self, key, value, tags, started, ttl):
+        raise NotImplementedError
+
+    def invalidate(self, tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalFeedCache(FeedCacheBackend):
+    """In-process LRU backend."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._bumped = {}  # tag -> (sequence, monotonic time) of the last invalidation
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            return self._sequence
+
+    def _is_fresh(self, entry, now):
+        value, tags, started, expires_at = entry
+        if expires_at <= now:
+            return False
+        return all(self._bumped.get(tag, (0, 0))[0] <= started for tag in tags)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not self._is_fresh(entry, now):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, tags, started, ttl):
+        now = time.monotonic()
+        with self._lock:
+            entry = (value, tuple(tags), started, now + ttl)
+            if not self._is_fresh(entry, now):
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tags):
+        now = time.monotonic()
+        with self._lock:
+            self._sequence += 1
+            for tag in tags:
+                self._bumped[tag] = (self._sequence, now)
+            self._prune(now)
+
+    def _prune(self, now):
+        # A mark older than the longest TTL cannot affect any live entry
+        ttl = current_app.config['FEED_CACHE_TTL']
+        if len(self._bumped) > 4 * self.maxsize:
+            self._bumped = {tag: mark for tag, mark in self._bumped.items() if now - mark[1] <= ttl}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FeedCache:
+    """Flask extension wrapping the configured backend."""
+
+    def init_app(self, app):
+        app.config.setdefault('FEED_CACHE_ENABLED', os.getenv('FEED_CACHE_ENABLED', '1') == '1')
+        app.config.setdefault('FEED_CACHE_TTL', int(os.getenv('FEED_CACHE_TTL', 30)))
+        app.config.setdefault('FEED_CACHE_SIZE', int(os.getenv('FEED_CACHE_SIZE', 256)))
+        app.config.setdefault('FEED_CACHE_BACKEND', os.getenv(
+            'FEED_CACHE_BACKEND', 'app.services.feed_cache:LocalFeedCache'))
+
+        backend_cls = import_string(app.config['FEED_CACHE_BACKEND'])
+        app.extensions['feed_cache'] = backend_cls(maxsize=app.config['FEED_CACHE_SIZE'])
+
+    @property
+    def backend(self):
+        return current_app.extensions['feed_cache']
+
+    @property
+    def enabled(self):
+        return current_app.config['FEED_CACHE_ENABLED']
+
+    def begin(self):
+        return self.backend.begin()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        return self.backend.get(key)
+
+    def set(self, key, body, started, search=False, popular=False):
+        if not self.enabled:
+            return
+        tags = ['explore'] + [f"note:{note['id']}" for note in body['notes']]
+        if search:
+            tags.append('search')
+        if popular:
+            tags.append('popular')
+        self.backend.set(key, body, tags, started, current_app.config['FEED_CACHE_TTL'])
+
+    def invalidate_listing(self):
+        """A note entered or left the explore feed: every page may shift."""
+        self.backend.invalidate(['explore'])
+
+    def invalidate_notes(self, note_ids, favorites=False):
+        """Listed notes changed in place (content/title/protection, or their favorite counts)."""
+        tags = [f'note:{note_id}' for note_id in note_ids]
+        if not tags:
+            return
+        self.backend.invalidate(tags + ['popular' if favorites else 'search'])
+
+
+feed_cache = FeedCache()
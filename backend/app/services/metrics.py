@@ -0,0 +1,216 @@
+"""Request-scoped timings, a ``Server-Timing`` header and Prometheus metrics.
+
+Each request collects:
+
+- ``db``: number of SQL statements and time spent in them (engine events);
+- ``auth``, ``bcrypt``, ``serialize``: time in the auth decorators, in
+  password hashing and in building response bodies, via ``timed(name)``;
+- ``total``: wall time from ``before_request`` to ``after_request``.
+
+They are sent back in ``Server-Timing`` (visible in the browser's network
+panel) and folded into process-wide metrics served at ``/api/metrics`` in
+the Prometheus text format: request latency histograms per blueprint, SQL
+query counts, connection-pool gauges and any counter registered with
+``metrics.inc``. The registry lives in process memory, so each gunicorn
+worker reports its own numbers; scrape every worker or aggregate
+upstream.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TIMERS = ('auth', 'bcrypt', 'serialize')
+
+
+def _labels(labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels)
+
+
+class Registry:
+    """Thread-safe counters and histograms keyed by (name, sorted label pairs)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            buckets, total = self._histograms.get(key, ([0] * len(LATENCY_BUCKETS), [0.0, 0]))
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    buckets[i] += 1
+            total[0] += value
+            total[1] += 1
+            self._histograms[key] = (buckets, total)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (buckets[:], total[:])) for key, (buckets, total) in self._histograms.items())
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# HELP {name} {self._help.get(name, name)}')
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{{{_labels(labels)}}} {value:g}')
+
+        for (name, labels), (buckets, (total, count)) in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# HELP {name} {self._help.get(name, name)}')
+                lines.append(f'# TYPE {name} histogram')
+            prefix = _labels(labels) + ',' if labels else ''
+            for bound, bucket in zip(LATENCY_BUCKETS, buckets):
+                lines.append(f'{name}_bucket{{{prefix}le="{bound:g}"}} {bucket}')
+            lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{_labels(labels)}}} {total:.6f}')
+            lines.append(f'{name}_count{{{_labels(labels)}}} {count}')
+        return lines
+
+
+class Metrics:
+    """Flask extension wiring the per-request hooks into the app."""
+
+    def __init__(self):
+        self.registry = Registry()
+        self.registry.describe('notes_http_request_duration_seconds', 'Request latency by blueprint.')
+        self.registry.describe('notes_http_requests_total', 'Requests by blueprint and status code.')
+        self.registry.describe('notes_db_queries_total', 'SQL statements executed while serving requests.')
+        self.registry.describe('notes_db_query_seconds_total', 'Time spent in SQL while serving requests.')
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', os.getenv('METRICS_ENABLED', '1') == '1')
+        app.config.setdefault('SERVER_TIMING_ENABLED', os.getenv('SERVER_TIMING_ENABLED', '1') == '1')
+        # When set, /api/metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+        app.config.setdefault('METRICS_TOKEN', os.getenv('METRICS_TOKEN'))
+        app.extensions['metrics'] = self
+
+        if app.config['METRICS_ENABLED']:
+            app.before_request(_start_request)
+            app.after_request(self._finish_request)
+
+    def inc(self, name, amount=1, **labels):
+        self.registry.inc(name, amount, **labels)
+
+    def _finish_request(self, response):
+        stats = g.get('request_stats')
+        if stats is None:
+            return response
+
+        elapsed = time.perf_counter() - stats['started']
+        blueprint = request.blueprint or 'app'
+        self.registry.observe('notes_http_request_duration_seconds', elapsed,
+                              blueprint=blueprint, method=request.method)
+        self.registry.inc('notes_http_requests_total', blueprint=blueprint, status=response.status_code)
+        self.registry.inc('notes_db_queries_total', stats['queries'], blueprint=blueprint)
+        self.registry.inc('notes_db_query_seconds_total', stats['query_time'], blueprint=blueprint)
+
+        if current_app.config['SERVER_TIMING_ENABLED']:
+            parts = [f'db;dur={stats["query_time"] * 1e3:.2f};desc="{stats["queries"]} queries"']
+            parts += [f'{name};dur={stats[name] * 1e3:.2f}' for name in TIMERS if stats[name]]
+            parts.append(f'total;dur={elapsed * 1e3:.2f}')
+            response.headers['Server-Timing'] = ', '.join(parts)
+        return response
+
+    def render(self, engines):
+        """The Prometheus text exposition for this process."""
+        lines = self.registry.render()
+        lines.append('# HELP notes_db_pool_connections Connections per pool state.')
+        lines.append('# TYPE notes_db_pool_connections gauge')
+        for bind, engine in engines.items():
+            for state, value in pool_stats(engine).items():
+                if state != 'saturation':
+                    lines.append(f'notes_db_pool_connections{{bind="{bind or "default"}",state="{state}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _start_request():
+    g.request_stats = {'started': time.perf_counter(), 'queries': 0, 'query_time': 0.0,
+                       **{name: 0.0 for name in TIMERS}}
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the current request's ``name`` timer."""
+    stats = g.get('request_stats') if has_request_context() else None
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats[name] += time.perf_counter() - start
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_started', None)
+    stats = g.get('request_stats') if has_request_context() else None
+    if stats is not None and started is not None:
+        stats['queries'] += 1
+        stats['query_time'] += time.perf_counter() - started
+
+
+def pool_stats(engine):
+    """Connection counts of a QueuePool-like pool; empty for pools without sizing (SQLite)."""
+    pool = engine.pool
+    if not hasattr(pool, 'checkedout') or not hasattr(pool, 'size'):
+        return {}
+    size = pool.size()
+    max_overflow = getattr(pool, '_max_overflow', 0)
+    checked_out = pool.checkedout()
+    capacity = size + max(max_overflow, 0)
+    return {
+        'size': size,
+        'checked_in': pool.checkedin(),
+        'checked_out': checked_out,
+        'overflow': max(pool.overflow(), 0),
+        'saturation': round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+def database_health(engines):
+    """Return (ready, details) after a ``SELECT 1`` on every bind."""
+    ready = True
+    details = {}
+    for bind, engine in engines.items():
+        start = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+            status = {'ready': True, 'latency_ms': round((time.perf_counter() - start) * 1e3, 2)}
+        except Exception as exc:  # any driver error means "not ready"
+            ready = False
+            status = {'ready': False, 'error': exc.__class__.__name__}
+        status['pool'] = pool_stats(engine)
+        details[bind or 'default'] = status
+    return ready, details
+
+
+metrics = Metrics()
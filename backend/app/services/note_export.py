@@ -0,0 +1,114 @@
+"""Streaming export of a user's notes as NDJSON or as a zip of Markdown files.
+
+Notes are read with ``yield_per`` over a server-side cursor and written out as
+they arrive, so memory use does not grow with the number of notes. Protected
+notes are exported without their content, the same as everywhere else in the
+API.
+"""
+import io
+import json
+import re
+import zipfile
+
+from sqlalchemy.orm import undefer_group
+
+from app.models.note import Note
+
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_notes(user_id, batch_size=500):
+    query = Note.query.options(undefer_group('content'))\
+        .filter_by(user_id=user_id)\
+        .order_by(Note.id)\
+        .execution_options(stream_results=True)\
+        .yield_per(batch_size)
+    return iter(query)
+
+
+def note_record(note):
+    return {
+        'id': note.id,
+        'title': note.title,
+        'content': None if note.visibility == 'protected' else note.content,
+        'visibility': note.visibility,
+        'favorite_count': note.favorite_count,
+        'created_at': note.created_at.isoformat() if note.created_at else None,
+        'updated_at': note.updated_at.isoformat() if note.updated_at else None,
+    }
+
+
+def export_ndjson(user_id, batch_size=500):
+    """Yield NDJSON in chunks of roughly CHUNK_SIZE bytes."""
+    chunk = []
+    size = 0
+    for note in iter_notes(user_id, batch_size):
+        line = json.dumps(note_record(note), ensure_ascii=False) + '\n'
+        chunk.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def markdown_document(record):
+    """A note as Markdown with a small front matter block (read back by the importer)."""
+    lines = [
+        '---',
+        f"id: {record['id']}",
+        f"visibility: {record['visibility']}",
+        f"created_at: {record['created_at'] or ''}",
+        f"updated_at: {record['updated_at'] or ''}",
+        '---',
+        f"# {record['title']}",
+        '',
+    ]
+    if record['content'] is None:
+        lines.append('_Protected note: content is not exported._')
+    else:
+        lines.append(record['content'])
+    return '\n'.join(lines) + '\n'
+
+
+def markdown_filename(record):
+    slug = re.sub(r'[^\w-]+', '-', record['title'].lower()).strip('-')[:60] or 'note'
+    return f"{record['id']}-{slug}.md"
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink that zipfile can stream into and we can drain."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def export_markdown_zip(user_id, batch_size=500):
+    """Yield a zip archive with one Markdown file per note, without building it in memory."""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for note in iter_notes(user_id, batch_size):
+            record = note_record(note)
+            archive.writestr(markdown_filename(record), markdown_document(record))
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()
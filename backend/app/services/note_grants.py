@@ -0,0 +1,67 @@
+"""Short-lived access grants for protected notes.
+
+After ``verify-password`` succeeds the client gets a signed grant scoped to the
+note and to the current password hash. Sending it back in the ``X-Note-Grant``
+header lets ``GET /api/notes/<id>`` return the content without another bcrypt
+check. Changing the note password changes the hash, which invalidates every
+outstanding grant for that note.
+
+Grants are signed with a key derived from ``JWT_SECRET_KEY`` rather than the
+key itself, so a grant is never accepted as a login token (nor the reverse).
+"""
+import hashlib
+import hmac
+import os
+from datetime import datetime, timedelta
+
+import jwt
+from flask import current_app, request
+
+GRANT_HEADER = 'X-Note-Grant'
+GRANT_PURPOSE = 'note_access'
+
+
+def init_app(app):
+    app.config.setdefault('NOTE_GRANT_TTL', int(os.getenv('NOTE_GRANT_TTL', 900)))
+
+
+def _signing_key():
+    secret = current_app.config['JWT_SECRET_KEY'].encode('utf-8')
+    return hmac.new(secret, GRANT_PURPOSE.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def password_version(note):
+    """Fingerprint of the note's current password hash."""
+    return hashlib.sha256((note.password_hash or '').encode('utf-8')).hexdigest()[:16]
+
+
+def issue_grant(note):
+    """Return (grant, expires_in seconds) for a note whose password was just verified."""
+    ttl = current_app.config['NOTE_GRANT_TTL']
+    payload = {
+        'purpose': GRANT_PURPOSE,
+        'note_id': note.id,
+        'pv': password_version(note),
+        'exp': datetime.utcnow() + timedelta(seconds=ttl),
+    }
+    grant = jwt.encode(payload, _signing_key(), algorithm='HS256')
+    return grant, ttl
+
+
+def has_valid_grant(note, grant=None):
+    """True if ``grant`` (default: the request header) unlocks this protected note."""
+    if grant is None:
+        grant = request.headers.get(GRANT_HEADER)
+    if not grant or not note.password_hash:
+        return False
+
+    try:
+        payload = jwt.decode(grant, _signing_key(), algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return False
+
+    return (
+        payload.get('purpose') == GRANT_PURPOSE
+        and payload.get('note_id') == note.id
+        and payload.get('pv') == password_version(note)
+    )
@@ -0,0 +1,249 @@
+"""Bulk import of notes from NDJSON or Markdown (a zip archive or a directory).
+
+Sources are parsed as a stream of ``(ref, data)`` records, where ``ref`` names
+the line or file for error reports. Every record goes through the same
+``validate_note_data`` rules as ``POST /api/notes``; invalid records are
+reported and skipped, valid ones are inserted with one executemany per batch
+and committed batch by batch, so a bad record never aborts the run. Content
+is indexed for search from those in-memory rows, never read back.
+
+Markdown files use the layout written by the export: an optional front matter
+block (``visibility``, ``password``, ``created_at``, ``updated_at``), a
+``# Title`` line, and the content below it.
+"""
+import io
+import json
+import os
+import zipfile
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+from sqlalchemy import func, insert
+
+from app import db
+from app.models.note import Note, content_columns
+from app.services.feed_cache import feed_cache
+from app.services.passwords import password_hasher
+from app.services.search import IndexedNote, search_index
+from app.utils.validation import validate_note_data
+
+FORMATS = ('ndjson', 'zip')
+
+
+class ImportTooLarge(ValueError):
+    """An archive member, the whole archive or its number of protected notes is more than the import allows."""
+
+
+class ImportResult:
+    def __init__(self, max_errors=100):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, ref, message):
+        self.failed += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append({'ref': ref, 'error': message})
+
+    def to_dict(self):
+        return {'imported': self.imported, 'failed': self.failed, 'errors': self.errors}
+
+
+def read_ndjson(stream):
+    """Yield ``(ref, data)`` for each non-blank line of a binary NDJSON stream."""
+    text = io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    try:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                data = None
+            yield f'line {line_number}', data
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+
+
+def parse_markdown(text):
+    """Return a note payload dict from a Markdown document."""
+    lines = text.lstrip('\ufeff').splitlines()
+    data = {}
+
+    if lines and lines[0].strip() == '---' and '---' in (line.strip() for line in lines[1:]):
+        end = next(i for i in range(1, len(lines)) if lines[i].strip() == '---')
+        for line in lines[1:end]:
+            key, sep, value = line.partition(':')
+            if sep and key.strip() in ('visibility', 'password', 'created_at', 'updated_at'):
+                data[key.strip()] = value.strip()
+        lines = lines[end + 1:]
+
+    for index, line in enumerate(lines):
+        if line.strip():
+            if line.startswith('# '):
+                data['title'] = line[2:]
+                lines = lines[index + 1:]
+            break
+
+    data['content'] = '\n'.join(lines)
+    return data
+
+
+def read_markdown_zip(fileobj, max_file_size=None, max_total_size=None):
+    """Yield ``(ref, data)`` for each ``.md`` file of a zip archive.
+
+    The uncompressed sizes are checked against the limits before anything is
+    read (a small upload can expand to gigabytes), and again while reading, in
+    case the archive understates them. Raises ``ImportTooLarge``.
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and info.filename.lower().endswith('.md')]
+        for info in members:
+            if max_file_size is not None and info.file_size > max_file_size:
+                raise ImportTooLarge(f'{info.filename} is larger than {max_file_size} bytes')
+        if max_total_size is not None and sum(info.file_size for info in members) > max_total_size:
+            raise ImportTooLarge(f'Archive content is larger than {max_total_size} bytes')
+
+        total = 0
+        for info in members:
+            with archive.open(info) as member:
+                data = member.read() if max_file_size is None else member.read(max_file_size + 1)
+            total += len(data)
+            if max_file_size is not None and len(data) > max_file_size:
+                raise ImportTooLarge(f'{info.filename} is larger than {max_file_size} bytes')
+            if max_total_size is not None and total > max_total_size:
+                raise ImportTooLarge(f'Archive content is larger than {max_total_size} bytes')
+            yield info.filename, parse_markdown(data.decode('utf-8', errors='replace'))
+
+
+def read_markdown_dir(path):
+    """Yield ``(ref, data)`` for each ``.md`` file below ``path``, in a stable order."""
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith('.md'):
+                continue
+            full_path = os.path.join(root, name)
+            with open(full_path, encoding='utf-8', errors='replace') as f:
+                yield os.path.relpath(full_path, path), parse_markdown(f.read())
+
+
+def read_upload(fileobj, import_format, max_file_size=None, max_total_size=None):
+    """Records of an uploaded file in one of ``FORMATS`` (limits apply to zip archives)."""
+    if import_format == 'zip':
+        return read_markdown_zip(fileobj, max_file_size, max_total_size)
+    return read_ndjson(fileobj)
+
+
+def _parse_timestamp(value):
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    # Stored timestamps are naive UTC
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _row(fields, data, user_id):
+    now = datetime.utcnow()
+    created_at = _parse_timestamp(data.get('created_at')) or now
+    return {
+        'title': fields['title'],
+        'visibility': fields['visibility'],
+        'password_hash': password_hasher.hash(fields['password']) if fields['password'] else None,
+        'user_id': user_id,
+        'created_at': created_at,
+        'updated_at': max(created_at, _parse_timestamp(data.get('updated_at')) or created_at),
+        **content_columns(fields['content']),
+    }
+
+
+def insert_notes(rows, contents, user_id):
+    """Insert note ``rows`` for ``user_id`` with one executemany and index them.
+
+    ``contents`` holds each row's plain content (a row may carry it
+    compressed). Returns the new ids in row order. Does not commit.
+    """
+    # Notes created after this point by the user are this batch, plus any concurrent
+    # create; MySQL cannot RETURNING an executemany, so rows are matched back by
+    # title and content hash from an id-only query, never by reading the bodies
+    last_id = db.session.query(func.max(Note.id)).scalar() or 0
+    # render_nulls: rows with and without a password stay one executemany instead of
+    # being split wherever the set of non-NULL columns changes
+    db.session.execute(insert(Note).execution_options(render_nulls=True), rows)
+
+    positions = defaultdict(deque)
+    for position, row in enumerate(rows):
+        positions[(row['title'], row['content_hash'])].append(position)
+    ids = [None] * len(rows)
+    inserted = db.session.query(Note.id, Note.title, Note.content_hash)\
+        .filter(Note.user_id == user_id, Note.id > last_id)\
+        .order_by(Note.id)
+    for note_id, title, content_hash in inserted:
+        matches = positions.get((title, content_hash))
+        if matches:
+            ids[matches.popleft()] = note_id
+
+    if not search_index.maintains_itself:
+        search_index.index_notes([
+            IndexedNote(note_id, row['title'], content)
+            for note_id, row, content in zip(ids, rows, contents) if note_id is not None
+        ])
+    return ids
+
+
+def _insert_batch(rows, contents, user_id):
+    insert_notes(rows, contents, user_id)
+    db.session.commit()
+
+
+def import_notes(records, user_id, batch_size=500, progress=None, max_errors=100, max_protected=None):
+    """Validate and insert ``(ref, data)`` records for ``user_id``.
+
+    ``progress`` is called with the ``ImportResult`` after every committed batch.
+    At most ``max_errors`` error details are kept (``None`` keeps all).
+    Raises ``ImportTooLarge`` before hashing the password of protected note
+    number ``max_protected + 1``; batches committed before it are kept.
+    """
+    result = ImportResult(max_errors)
+    rows = []
+    contents = []
+    listed = False
+    protected = 0
+
+    def flush():
+        nonlocal rows, contents
+        if rows:
+            _insert_batch(rows, contents, user_id)
+            result.imported += len(rows)
+            rows = []
+            contents = []
+        if progress:
+            progress(result)
+
+    for ref, data in records:
+        fields, error = validate_note_data(data)
+        if error:
+            result.add_error(ref, error)
+            continue
+        if fields['password']:
+            protected += 1
+            if max_protected is not None and protected > max_protected:
+                raise ImportTooLarge(f'At most {max_protected} protected notes per import')
+        rows.append(_row(fields, data, user_id))
+        contents.append(fields['content'])
+        listed = listed or fields['visibility'] != 'private'
+        if len(rows) >= batch_size:
+            flush()
+    flush()
+
+    if listed:
+        feed_cache.invalidate_listing()
+    return result
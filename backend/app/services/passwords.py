@@ -0,0 +1,102 @@
+"""Central bcrypt hashing for account passwords, security answers and note passwords.
+
+Hashing runs on a small per-process thread pool (bcrypt releases the GIL) with
+a bound on how many calls may be running or waiting. When the pool is
+saturated, callers get ``HashingUnavailable`` (served as 503) instead of
+tying up a request worker, so cheap reads keep flowing during a login burst.
+
+That only holds if the bound is below the request threads of a process
+(``GUNICORN_THREADS``): ``HASHING_WORKERS + HASHING_MAX_PENDING`` threads may
+be busy with bcrypt, the rest must stay free for everything else.
+``init_app`` refuses a configuration that leaves no thread free.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from flask import current_app, jsonify
+
+from app.services.metrics import timed
+
+
+class HashingUnavailable(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._slots = None
+
+    def init_app(self, app):
+        app.config.setdefault('BCRYPT_ROUNDS', int(os.getenv('BCRYPT_ROUNDS', 12)))
+        app.config.setdefault('HASHING_WORKERS', int(os.getenv('HASHING_WORKERS', 2)))
+        app.config.setdefault('HASHING_MAX_PENDING', int(os.getenv('HASHING_MAX_PENDING', 1)))
+        app.config.setdefault('HASHING_QUEUE_TIMEOUT', float(os.getenv('HASHING_QUEUE_TIMEOUT', 0.1)))
+        # Same variable gunicorn.conf.py reads for its request threads per worker
+        app.config.setdefault('REQUEST_THREADS', int(os.getenv('GUNICORN_THREADS', 4)))
+
+        admitted = app.config['HASHING_WORKERS'] + app.config['HASHING_MAX_PENDING']
+        if admitted >= app.config['REQUEST_THREADS']:
+            raise ValueError(
+                f'HASHING_WORKERS + HASHING_MAX_PENDING ({admitted}) must be below the '
+                f"request threads per worker ({app.config['REQUEST_THREADS']}), or hashing "
+                f'can occupy every thread'
+            )
+        app.extensions['password_hasher'] = self
+        app.register_error_handler(HashingUnavailable, _hashing_unavailable)
+
+    def _pool(self):
+        # Threads do not survive fork(), so each gunicorn worker builds its own pool
+        with self._lock:
+            if self._pid != os.getpid():
+                config = current_app.config
+                workers = config['HASHING_WORKERS']
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+                self._slots = threading.BoundedSemaphore(workers + config['HASHING_MAX_PENDING'])
+                self._pid = os.getpid()
+            return self._executor, self._slots
+
+    def _run(self, fn, *args):
+        executor, slots = self._pool()
+        if not slots.acquire(timeout=current_app.config['HASHING_QUEUE_TIMEOUT']):
+            raise HashingUnavailable()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        with timed('bcrypt'):
+            return future.result()
+
+    def hash(self, secret):
+        rounds = current_app.config['BCRYPT_ROUNDS']
+        hashed = self._run(lambda: bcrypt.hashpw(secret.encode('utf-8'), bcrypt.gensalt(rounds)))
+        return hashed.decode('utf-8')
+
+    def verify(self, secret, hashed):
+        if not hashed:
+            return False
+        return self._run(bcrypt.checkpw, secret.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        """True when ``hashed`` was made with a different cost than BCRYPT_ROUNDS."""
+        try:
+            rounds = int(hashed.split('$')[2])
+        except (AttributeError, IndexError, ValueError):
+            return False
+        return rounds != current_app.config['BCRYPT_ROUNDS']
+
+
+def _hashing_unavailable(e):
+    response = jsonify({'error': 'Server is busy, please try again'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+password_hasher = PasswordHasher()
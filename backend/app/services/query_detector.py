@@ -0,0 +1,168 @@
+"""N+1 and slow-query detector for development and CI.
+
+With ``QUERY_DETECTOR`` set to ``log`` or ``raise``, every SQL statement run
+while serving a request is reduced to its shape (literals, bound values and
+``IN (...)`` lists collapsed). At the end of the request:
+
+- a shape that ran more than ``QUERY_DETECTOR_THRESHOLD`` times is reported
+  as a probable N+1 (a query issued once per row of a result);
+- any statement slower than ``QUERY_DETECTOR_SLOW_MS`` is reported as slow.
+
+``log`` writes a warning, ``raise`` raises ``QueryBudgetExceeded`` (a 500 in
+the app, an exception in the test client), which is what CI wants. The
+default, ``off``, installs nothing. ``detect_queries()`` applies the same
+checks to a block of code outside a request, e.g. a CLI job.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'log', 'raise')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|:\w+|\?')
+_IN_LIST = re.compile(r'IN \((?:\?\s*,\s*)*\?\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def normalize(statement):
+    """Reduce a SQL statement to a shape shared by every execution with other values."""
+    shape = _STRING.sub('?', statement)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+class QueryReport:
+    """Statements seen in one request (or one ``detect_queries`` block)."""
+
+    def __init__(self, threshold, slow_ms):
+        self.threshold = threshold
+        self.slow_ms = slow_ms
+        self.shapes = Counter()
+        self.slow = []
+
+    def record(self, statement, elapsed):
+        shape = normalize(statement)
+        self.shapes[shape] += 1
+        if elapsed * 1e3 > self.slow_ms:
+            self.slow.append((shape, elapsed * 1e3))
+
+    @property
+    def total(self):
+        return sum(self.shapes.values())
+
+    @property
+    def repeated(self):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > self.threshold]
+
+    def problems(self):
+        lines = [f'{count}x {shape[:300]}' for shape, count in self.repeated]
+        lines += [f'{elapsed:.1f}ms (budget {self.slow_ms}ms) {shape[:300]}' for shape, elapsed in self.slow]
+        return lines
+
+
+def init_app(app):
+    app.config.setdefault('QUERY_DETECTOR', os.getenv('QUERY_DETECTOR', 'off'))
+    app.config.setdefault('QUERY_DETECTOR_THRESHOLD', int(os.getenv('QUERY_DETECTOR_THRESHOLD', 5)))
+    app.config.setdefault('QUERY_DETECTOR_SLOW_MS', float(os.getenv('QUERY_DETECTOR_SLOW_MS', 100)))
+
+    mode = app.config['QUERY_DETECTOR']
+    if mode not in MODES:
+        raise ValueError(f'QUERY_DETECTOR must be one of {", ".join(MODES)}, got {mode!r}')
+    if mode != 'off':
+        _install_listeners()
+        app.before_request(_start_request)
+        app.after_request(_check_request)
+
+
+def _new_report():
+    config = current_app.config
+    return QueryReport(config['QUERY_DETECTOR_THRESHOLD'], config['QUERY_DETECTOR_SLOW_MS'])
+
+
+def _start_request():
+    g.query_report = _new_report()
+
+
+def _check_request(response):
+    report = g.pop('query_report', None)
+    if report is not None:
+        _report(report, f'{request.method} {request.path}', current_app.config['QUERY_DETECTOR'])
+    return response
+
+
+def _report(report, where, mode):
+    problems = report.problems()
+    if not problems:
+        return
+    message = f'{where}: {report.total} queries, query budget exceeded:\n  ' + '\n  '.join(problems)
+    if mode == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+_local = threading.local()
+_installed = False
+_install_lock = threading.Lock()
+
+
+def _current_report():
+    report = getattr(_local, 'report', None)
+    if report is None and has_request_context():
+        report = g.get('query_report')
+    return report
+
+
+def _install_listeners():
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _installed = True
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['detector_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('detector_started', None)
+    report = _current_report()
+    if report is not None and started is not None:
+        report.record(statement, time.perf_counter() - started)
+
+
+@contextmanager
+def detect_queries(threshold=None, slow_ms=None, mode='raise', where='block'):
+    """Check the statements run inside the block; yields the ``QueryReport``."""
+    config = current_app.config
+    report = QueryReport(
+        config.get('QUERY_DETECTOR_THRESHOLD', 5) if threshold is None else threshold,
+        config.get('QUERY_DETECTOR_SLOW_MS', 100) if slow_ms is None else slow_ms,
+    )
+    _install_listeners()
+    previous, _local.report = getattr(_local, 'report', None), report
+    try:
+        yield report
+    finally:
+        _local.report = previous
+    _report(report, where, mode)
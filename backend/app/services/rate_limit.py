@@ -0,0 +1,230 @@
+"""Token-bucket rate limiting for the endpoints that run bcrypt on every attempt.
+
+Login, the security-answer check and note password verification each cost
+a full bcrypt computation, so a client guessing passwords is throttled
+before any hashing (or even the user lookup) happens. An attempt takes one
+token from every bucket that applies:
+
+- ``ip:<client address>``, shared by all three endpoints (``RATE_LIMIT_PER_IP``);
+- ``account:<email>`` for login and the security answer (``RATE_LIMIT_PER_ACCOUNT``);
+- ``note:<id>`` for note passwords (``RATE_LIMIT_PER_NOTE``).
+
+Limits are written ``"<attempts>/<seconds>"``: a bucket holds ``attempts``
+tokens and refills at ``attempts / seconds`` per second. A request finding
+any bucket empty gets ``429`` with ``Retry-After``; every check is counted
+in ``notes_rate_limit_checks_total`` on ``/api/metrics``.
+
+The default backend keeps buckets in process memory, so each gunicorn worker
+enforces the limits on its own (a client gets at most ``workers`` times the
+budget). ``RedisRateLimiter`` shares buckets across workers and hosts;
+select it, or any ``RateLimitBackend``, with ``RATE_LIMIT_BACKEND``.
+``LocalRateLimiter`` follows the same contract and stands in for it in
+tests.
+
+Behind a reverse proxy, set ``RATE_LIMIT_TRUSTED_PROXIES`` to the number of
+proxies that append to ``X-Forwarded-For`` (1 for the nginx in the deploy
+guide); otherwise every client shares the proxy's address.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+from werkzeug.utils import import_string
+
+from app.services.metrics import metrics
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+def parse_limit(value):
+    """``"5/60"`` -> (capacity 5, refill rate 5/60 tokens per second)."""
+    attempts, _, seconds = str(value).partition('/')
+    capacity = int(attempts)
+    period = float(seconds or 1)
+    if capacity <= 0 or period <= 0:
+        raise ValueError(f'Rate limit must look like "<attempts>/<seconds>", got {value!r}')
+    return capacity, capacity / period
+
+
+class RateLimitBackend:
+    """Storage interface for token buckets."""
+
+    @classmethod
+    def from_config(cls, config):
+        return cls()
+
+    def take(self, key, capacity, rate):
+        """Take one token from ``key``; return 0 if allowed, else the seconds until a token is available."""
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+
+class LocalRateLimiter(RateLimitBackend):
+    """In-process buckets; the least recently used are dropped beyond ``maxsize``."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, monotonic time of last update)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(maxsize=config['RATE_LIMIT_SIZE'])
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# Refill, take and store in one round trip; Redis' clock keeps hosts consistent
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class RedisRateLimiter(RateLimitBackend):
+    """Buckets shared by every worker through Redis (needs the ``redis`` package)."""
+
+    def __init__(self, url, prefix='notes:ratelimit:'):
+        self.url = url
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._pid = None
+        self._client = None
+        self._script = None
+
+    @classmethod
+    def from_config(cls, config):
+        url = config.get('RATE_LIMIT_REDIS_URL')
+        if not url:
+            raise RuntimeError('RedisRateLimiter needs RATE_LIMIT_REDIS_URL')
+        return cls(url)
+
+    def _take_script(self):
+        # Sockets must not be shared with the gunicorn master, connect per process
+        with self._lock:
+            if self._pid != os.getpid():
+                import redis
+
+                client = redis.Redis.from_url(self.url)
+                self._script = client.register_script(_TAKE_SCRIPT)
+                self._client = client
+                self._pid = os.getpid()
+            return self._script
+
+    def take(self, key, capacity, rate):
+        return float(self._take_script()(keys=[self.prefix + key], args=[capacity, rate]))
+
+    def reset(self):
+        self._take_script()
+        for key in self._client.scan_iter(match=self.prefix + '*'):
+            self._client.delete(key)
+
+
+class RateLimiter:
+    """Flask extension holding the configured backend and limits."""
+
+    RULES = {'ip': 'RATE_LIMIT_PER_IP', 'account': 'RATE_LIMIT_PER_ACCOUNT', 'note': 'RATE_LIMIT_PER_NOTE'}
+
+    def init_app(self, app):
+        app.config.setdefault('RATE_LIMIT_ENABLED', os.getenv('RATE_LIMIT_ENABLED', '1') == '1')
+        app.config.setdefault('RATE_LIMIT_PER_IP', os.getenv('RATE_LIMIT_PER_IP', '30/60'))
+        app.config.setdefault('RATE_LIMIT_PER_ACCOUNT', os.getenv('RATE_LIMIT_PER_ACCOUNT', '5/60'))
+        app.config.setdefault('RATE_LIMIT_PER_NOTE', os.getenv('RATE_LIMIT_PER_NOTE', '10/60'))
+        app.config.setdefault('RATE_LIMIT_TRUSTED_PROXIES', int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', 0)))
+        app.config.setdefault('RATE_LIMIT_SIZE', int(os.getenv('RATE_LIMIT_SIZE', 10000)))
+        app.config.setdefault('RATE_LIMIT_REDIS_URL', os.getenv('RATE_LIMIT_REDIS_URL'))
+        app.config.setdefault('RATE_LIMIT_BACKEND', os.getenv(
+            'RATE_LIMIT_BACKEND', 'app.services.rate_limit:LocalRateLimiter'))
+
+        limits = {rule: parse_limit(app.config[name]) for rule, name in self.RULES.items()}
+        backend_cls = import_string(app.config['RATE_LIMIT_BACKEND'])
+        app.extensions['rate_limiter'] = (backend_cls.from_config(app.config), limits)
+        app.register_error_handler(RateLimited, _rate_limited)
+        metrics.registry.describe('notes_rate_limit_checks_total',
+                                  'Rate limit checks by endpoint, bucket and result (allowed/limited).')
+
+    @property
+    def backend(self):
+        return current_app.extensions['rate_limiter'][0]
+
+    def check(self, endpoint, account=None, note_id=None):
+        """Take a token for this attempt from each applicable bucket; raise ``RateLimited`` if one is empty."""
+        if not current_app.config['RATE_LIMIT_ENABLED']:
+            return
+        backend, limits = current_app.extensions['rate_limiter']
+        keys = [('ip', client_address())]
+        if account:
+            keys.append(('account', account.strip().lower()))
+        if note_id is not None:
+            keys.append(('note', str(note_id)))
+
+        retry_after = 0.0
+        for rule, value in keys:
+            capacity, rate = limits[rule]
+            wait = backend.take(f'{rule}:{value}', capacity, rate)
+            metrics.inc('notes_rate_limit_checks_total', endpoint=endpoint, bucket=rule,
+                        result='limited' if wait else 'allowed')
+            retry_after = max(retry_after, wait)
+        if retry_after:
+            raise RateLimited(retry_after)
+
+
+def client_address():
+    """The caller's IP, read from ``X-Forwarded-For`` behind ``RATE_LIMIT_TRUSTED_PROXIES`` proxies."""
+    proxies = current_app.config['RATE_LIMIT_TRUSTED_PROXIES']
+    if proxies:
+        forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.remote_addr or 'unknown'
+
+
+def _rate_limited(e):
+    response = jsonify({'error': 'Too many attempts, please try again later'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+    return response
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,134 @@
+"""Revision history for note edits, stored as compressed line deltas.
+
+Every edit that changes a note's title or content adds a ``NoteRevision``.
+The first edit also records the note as it was before it (revision 1), so
+the original text is never lost. Revisions store content one of two ways:
+
+- keyframe: the full content;
+- delta: the edit against the previous revision, as a JSON list where
+  ``[i, j]`` copies lines ``i:j`` of the previous version and a string is
+  inserted text.
+
+Both are compressed with ``content_codec``. Revision 1 is always a keyframe,
+and so is any revision ``REVISION_KEYFRAME_INTERVAL`` revisions after the
+last one. A revision is also stored as a keyframe whenever that is smaller
+than its delta. Rebuilding any version therefore reads one keyframe and at
+most ``interval - 1`` deltas, in a single query.
+"""
+import difflib
+import hashlib
+import json
+import os
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.models.revision import NoteRevision
+from app.services.content_codec import compress, decompress
+
+
+def init_app(app):
+    app.config.setdefault('REVISION_KEYFRAME_INTERVAL', int(os.getenv('REVISION_KEYFRAME_INTERVAL', 20)))
+
+
+def _lines(text):
+    return text.splitlines(keepends=True)
+
+
+def encode_delta(old, new):
+    """The JSON delta turning ``old`` into ``new``."""
+    old_lines, new_lines = _lines(old), _lines(new)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:  # replace or insert; a delete just skips old lines
+            ops.append(''.join(new_lines[j1:j2]))
+    return json.dumps(ops, separators=(',', ':'), ensure_ascii=False)
+
+
+def apply_delta(old, delta):
+    old_lines = _lines(old)
+    return ''.join(''.join(old_lines[op[0]:op[1]]) if isinstance(op, list) else op
+                   for op in json.loads(delta))
+
+
+def _pack(text):
+    config = current_app.config
+    return compress(text.encode('utf-8'), config['NOTE_COMPRESSION_CODEC'], config['NOTE_COMPRESSION_LEVEL'])
+
+
+def _hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _revision(note_id, number, user_id, title, content, data, is_keyframe, created_at=None):
+    return NoteRevision(
+        note_id=note_id, number=number, user_id=user_id, title=title, is_keyframe=is_keyframe, data=data,
+        content_length=len(content), content_hash=_hash(content), created_at=created_at,
+    )
+
+
+def record_edit(note, old_title, old_content, user_id):
+    """Add the revision for an edit of ``note`` (already holding the new title/content).
+
+    Call before committing the edit; the revision is part of the same
+    transaction. Two edits racing for the same revision number fail on the
+    ``unique_note_revision`` constraint at commit.
+    """
+    interval = max(1, current_app.config['REVISION_KEYFRAME_INTERVAL'])
+    last_keyframe = select(func.max(NoteRevision.number)).where(
+        NoteRevision.note_id == note.id, NoteRevision.is_keyframe.is_(True),
+    ).scalar_subquery()
+    with db.session.no_autoflush:  # keep the note's old updated_at for the baseline
+        last = db.session.execute(
+            select(NoteRevision.number, NoteRevision.content_hash, last_keyframe)
+            .where(NoteRevision.note_id == note.id)
+            .order_by(NoteRevision.number.desc())
+            .limit(1)
+        ).first()
+
+    if last is None:
+        # First edit: keep the version it replaces
+        db.session.add(_revision(note.id, 1, note.user_id, old_title, old_content, _pack(old_content), True,
+                                 created_at=note.updated_at or note.created_at))
+        last_number, last_hash, last_keyframe = 1, _hash(old_content), 1
+    else:
+        last_number, last_hash, last_keyframe = last
+
+    new_content = note.content
+    full = _pack(new_content)
+    number = last_number + 1
+    # A delta only applies to the exact text it was computed from; content changed
+    # outside record_edit (imports, manual fixes) starts a new keyframe
+    if number - last_keyframe >= interval or last_hash != _hash(old_content):
+        data, is_keyframe = full, True
+    else:
+        delta = _pack(encode_delta(old_content, new_content))
+        data, is_keyframe = (delta, False) if len(delta) < len(full) else (full, True)
+
+    revision = _revision(note.id, number, user_id, note.title, new_content, data, is_keyframe)
+    db.session.add(revision)
+    return revision
+
+
+def revision_content(note_id, number):
+    """Rebuild the content of revision ``number``, or None if it does not exist."""
+    keyframe = select(func.max(NoteRevision.number)).where(
+        NoteRevision.note_id == note_id, NoteRevision.number <= number, NoteRevision.is_keyframe.is_(True),
+    ).scalar_subquery()
+    chain = db.session.execute(
+        select(NoteRevision.number, NoteRevision.is_keyframe, NoteRevision.data)
+        .where(NoteRevision.note_id == note_id, NoteRevision.number.between(keyframe, number))
+        .order_by(NoteRevision.number)
+    ).all()
+    if not chain or chain[-1].number != number:
+        return None
+
+    content = None
+    for row in chain:
+        text = decompress(row.data)
+        content = text if row.is_keyframe else apply_delta(content, text)
+    return content
@@ -0,0 +1,113 @@
+"""Schema management at startup: migrations only, plus a cheap version check.
+
+The schema is owned by Flask-Migrate (``flask db upgrade``). ``create_app``
+no longer reflects or creates tables on every boot, so importing the app
+opens no database connection; with gunicorn ``--preload`` the pools are
+created lazily in each worker after the fork (see ``gunicorn.conf.py``).
+
+``DB_CREATE_ALL`` keeps the old ``db.create_all()`` for throwaway SQLite
+databases (benchmarks, local experiments), where it is the default.
+
+``SCHEMA_CHECK`` compares the ``alembic_version`` row with the head of the
+migrations directory once per process, on the first request:
+
+- ``off``: no check;
+- ``warn`` (default): log a warning when the database is behind or ahead;
+- ``strict``: also answer ``503`` to every request except ``/api/health``
+  until the database is migrated and the process restarted.
+"""
+import logging
+import os
+import threading
+
+from flask import current_app, request
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'warn', 'strict')
+
+
+def init_app(app, db):
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    default_create_all = '1' if uri.startswith('sqlite') else '0'
+    app.config.setdefault('DB_CREATE_ALL', os.getenv('DB_CREATE_ALL', default_create_all) == '1')
+    app.config.setdefault('SCHEMA_CHECK', os.getenv('SCHEMA_CHECK', 'warn'))
+
+    mode = app.config['SCHEMA_CHECK']
+    if mode not in MODES:
+        raise ValueError(f'SCHEMA_CHECK must be one of {", ".join(MODES)}, got {mode!r}')
+
+    if app.config['DB_CREATE_ALL']:
+        with app.app_context():
+            db.create_all()
+    elif mode != 'off':
+        state = SchemaState()
+        app.extensions['schema_state'] = state
+        app.before_request(state.check_request)
+
+
+def migration_heads(directory):
+    """Head revisions of the migrations directory (reads the scripts, no database)."""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config()
+    config.set_main_option('script_location', directory)
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def database_revisions(engine):
+    """Revisions stamped in ``alembic_version``; empty if the table is missing."""
+    with engine.connect() as conn:
+        try:
+            return {row[0] for row in conn.execute(text('SELECT version_num FROM alembic_version'))}
+        except SQLAlchemyError:
+            return set()
+
+
+class SchemaState:
+    """Result of the once-per-process schema version check."""
+
+    def __init__(self):
+        self.checked = False
+        self.current = set()
+        self.heads = set()
+        self._lock = threading.Lock()
+
+    @property
+    def ok(self):
+        return self.current == self.heads
+
+    def as_dict(self):
+        return {'ok': self.ok, 'current': sorted(self.current), 'head': sorted(self.heads)}
+
+    def check(self, app):
+        with self._lock:
+            if self.checked:
+                return self
+            from app import db
+
+            if not self.heads:
+                directory = app.extensions['migrate'].directory
+                if not os.path.isabs(directory):
+                    directory = os.path.join(os.path.dirname(app.root_path), directory)
+                self.heads = migration_heads(directory)
+            try:
+                with app.app_context():
+                    self.current = database_revisions(db.engine)
+            except SQLAlchemyError as exc:  # database unreachable: try again on the next request
+                logger.warning('Schema check skipped: %s', exc.__class__.__name__)
+                return self
+            self.checked = True
+        if not self.ok:
+            logger.warning('Database schema is at %s, migrations head is %s; run "flask db upgrade"',
+                           ', '.join(sorted(self.current)) or 'no revision', ', '.join(sorted(self.heads)))
+        return self
+
+    def check_request(self):
+        if not self.checked:
+            self.check(current_app._get_current_object())
+        if not self.ok and current_app.config['SCHEMA_CHECK'] == 'strict' and request.path != '/api/health':
+            return {'error': 'Database schema is out of date'}, 503
@@ -0,0 +1,351 @@
+"""Full-text search over note titles and content.
+
+The backend is picked from the database dialect: MySQL uses its native
+FULLTEXT indexes, SQLite uses an FTS5 table, and anything else (or a database
+where those are missing) falls back to an in-process inverted index.
+
+Content matches are only honoured where the caller may see the content: a
+protected or private note can still be found by its title, but never by
+words that only appear in its body. Callers pass that rule in as the
+``content_visible`` SQL condition.
+"""
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+
+from flask import current_app
+from sqlalchemy import case, or_, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import undefer_group
+from app import db
+from app.models.note import Note
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_QUERY_TERMS = 8
+
+# What index_notes reads from a note; bulk writers pass these instead of loaded Notes
+IndexedNote = namedtuple('IndexedNote', 'id title content')
+
+
+def tokenize(value):
+    """Lower-case word tokens of a string."""
+    return TOKEN_RE.findall(value.lower()) if value else []
+
+
+def query_terms(term):
+    """Distinct search terms of a user query, in order, capped at MAX_QUERY_TERMS."""
+    terms = []
+    for token in tokenize(term):
+        if token not in terms:
+            terms.append(token)
+    return terms[:MAX_QUERY_TERMS]
+
+
+class SearchBackend:
+    name = None
+    # True when the database keeps the index up to date without index_notes/remove_notes
+    maintains_itself = False
+
+    def is_available(self):
+        return True
+
+    def index_notes(self, notes):
+        """Add or refresh notes in the index. Called before the write is committed."""
+
+    def remove_notes(self, note_ids):
+        """Drop notes from the index. Called before the delete is committed."""
+
+    def filter(self, query, terms, content_visible, rank=True):
+        raise NotImplementedError
+
+
+class MySQLFulltextBackend(SearchBackend):
+    """Native FULLTEXT indexes, maintained by MySQL itself (see migration 0002)."""
+    name = 'mysql'
+    maintains_itself = True
+    INDEXES = ('ft_notes_title', 'ft_notes_title_content')
+
+    def is_available(self):
+        rows = db.session.execute(text(
+            "SELECT DISTINCT index_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'notes' AND index_type = 'FULLTEXT'"
+        )).scalars().all()
+        return set(self.INDEXES) <= {name.lower() for name in rows}
+
+    def filter(self, query, terms, content_visible, rank=True):
+        from sqlalchemy.dialects.mysql import match
+
+        against = ' '.join(f'+{term}*' for term in terms)
+        all_match = match(Note.title, Note.content, against=against).in_boolean_mode()
+        title_match = match(Note.title, against=against).in_boolean_mode()
+
+        query = query.filter(all_match > 0, or_(content_visible, title_match > 0))
+        if rank:
+            query = query.order_by(all_match.desc())
+        return query
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """FTS5 table keyed by note id, kept in sync from the write paths."""
+    name = 'sqlite'
+
+    def is_available(self):
+        exists = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notes_fts'"
+        )).first()
+        if exists:
+            return True
+
+        try:
+            db.session.execute(text('CREATE VIRTUAL TABLE notes_fts USING fts5(title, content)'))
+        except OperationalError:
+            db.session.rollback()
+            return False
+
+        self._rebuild()
+        db.session.commit()
+        return True
+
+    def _rebuild(self):
+        db.session.execute(text('DELETE FROM notes_fts'))
+        batch = []
+        for note in Note.query.options(undefer_group('content')).order_by(Note.id).yield_per(500):
+            batch.append(note)
+            if len(batch) >= 500:
+                self._insert(batch)
+                batch = []
+        self._insert(batch)
+
+    def _insert(self, notes):
+        if notes:
+            db.session.execute(
+                text('INSERT INTO notes_fts (rowid, title, content) VALUES (:id, :title, :content)'),
+                [{'id': note.id, 'title': note.title, 'content': note.content} for note in notes],
+            )
+
+    def index_notes(self, notes):
+        self.remove_notes([note.id for note in notes])
+        self._insert(notes)
+
+    def remove_notes(self, note_ids):
+        if note_ids:
+            db.session.execute(
+                text('DELETE FROM notes_fts WHERE rowid = :id'),
+                [{'id': note_id} for note_id in note_ids],
+            )
+
+    def filter(self, query, terms, content_visible, rank=True):
+        phrase = ' '.join('"%s"*' % term for term in terms)
+        hits = text(
+            'SELECT rowid AS note_id, -bm25(notes_fts, 10.0, 1.0) AS score '
+            'FROM notes_fts WHERE notes_fts MATCH :all_terms'
+        ).bindparams(all_terms=phrase).columns(note_id=db.Integer, score=db.Float).subquery('search_hits')
+        title_hits = text(
+            'SELECT rowid AS note_id FROM notes_fts WHERE notes_fts MATCH :title_terms'
+        ).bindparams(title_terms=f'title : ({phrase})').columns(note_id=db.Integer).subquery('title_hits')
+
+        query = query.join(hits, Note.id == hits.c.note_id)\
+            .filter(or_(content_visible, Note.id.in_(select(title_hits.c.note_id))))
+        if rank:
+            query = query.order_by(hits.c.score.desc())
+        return query
+
+
+class InvertedIndexBackend(SearchBackend):
+    """In-process inverted index, used when the database has no full-text support.
+
+    The index lives in each worker process. Writes made through this process
+    update it immediately; writes made by other workers are picked up when the
+    index is rebuilt after ``SEARCH_INDEX_REFRESH`` seconds.
+    """
+    name = 'memory'
+    TITLE_WEIGHT = 3.0
+
+    def __init__(self, refresh_interval=300, max_hits=1000):
+        self.refresh_interval = refresh_interval
+        self.max_hits = max_hits
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._postings = {}
+        self._documents = {}
+
+    def _ensure_built(self):
+        with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < self.refresh_interval:
+                return
+            self._postings = {}
+            self._documents = {}
+            for note in Note.query.options(undefer_group('content')).order_by(Note.id).yield_per(500):
+                self._add(note)
+            self._built_at = time.monotonic()
+
+    def _add(self, note):
+        document = {
+            'title': Counter(tokenize(note.title)),
+            'content': Counter(tokenize(note.content)),
+        }
+        self._documents[note.id] = document
+        for field, counts in document.items():
+            for token, tf in counts.items():
+                self._postings.setdefault(token, {}).setdefault(note.id, {})[field] = tf
+
+    def _discard(self, note_id):
+        document = self._documents.pop(note_id, None)
+        if not document:
+            return
+        for counts in document.values():
+            for token in counts:
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(note_id, None)
+                    if not postings:
+                        del self._postings[token]
+
+    def index_notes(self, notes):
+        with self._lock:
+            if self._built_at is None:
+                return
+            for note in notes:
+                self._discard(note.id)
+                self._add(note)
+
+    def remove_notes(self, note_ids):
+        with self._lock:
+            for note_id in note_ids:
+                self._discard(note_id)
+
+    def _search(self, terms):
+        """Return ({note_id: score}, {note ids matching every term in the title})."""
+        total = len(self._documents) or 1
+        scores = None
+        title_ids = None
+        for term in terms:
+            term_scores = {}
+            term_title_ids = set()
+            for token, postings in self._postings.items():
+                if not token.startswith(term):
+                    continue
+                idf = math.log(1 + total / len(postings))
+                for note_id, fields in postings.items():
+                    weight = self.TITLE_WEIGHT * fields.get('title', 0) + fields.get('content', 0)
+                    term_scores[note_id] = term_scores.get(note_id, 0) + weight * idf
+                    if 'title' in fields:
+                        term_title_ids.add(note_id)
+
+            if scores is None:
+                scores, title_ids = term_scores, term_title_ids
+            else:
+                scores = {note_id: score + term_scores[note_id]
+                          for note_id, score in scores.items() if note_id in term_scores}
+                title_ids &= term_title_ids
+
+        scores = scores or {}
+        if len(scores) > self.max_hits:
+            top = sorted(scores, key=scores.get, reverse=True)[:self.max_hits]
+            scores = {note_id: scores[note_id] for note_id in top}
+        return scores, (title_ids or set()) & scores.keys()
+
+    def filter(self, query, terms, content_visible, rank=True):
+        self._ensure_built()
+        with self._lock:
+            scores, title_ids = self._search(terms)
+
+        if not scores:
+            return query.filter(db.false())
+
+        query = query.filter(Note.id.in_(scores), or_(content_visible, Note.id.in_(title_ids)))
+        if rank:
+            query = query.order_by(case(scores, value=Note.id, else_=0).desc())
+        return query
+
+
+def searches_content_column(config):
+    """True when content search matches ``notes.content`` in the database (MySQL FULLTEXT).
+
+    Compressed bodies leave that column empty, so the two cannot be combined.
+    """
+    choice = config['SEARCH_BACKEND']
+    if choice == 'auto':
+        uri = config.get('SQLALCHEMY_DATABASE_URI')
+        choice = make_url(uri).get_backend_name() if uri else None
+    return choice == 'mysql'
+
+
+class SearchIndex:
+    """Flask extension that picks and owns the search backend for an app."""
+
+    def init_app(self, app):
+        app.config.setdefault('SEARCH_BACKEND', os.getenv('SEARCH_BACKEND', 'auto'))
+        app.config.setdefault('SEARCH_INDEX_REFRESH', 300)
+        app.config.setdefault('SEARCH_MAX_HITS', 1000)
+        app.extensions['search_index'] = {'backend': None, 'lock': threading.Lock()}
+
+        if app.config.get('NOTE_COMPRESSION_THRESHOLD') and searches_content_column(app.config):
+            raise RuntimeError(
+                'NOTE_COMPRESSION_THRESHOLD cannot be used with the MySQL FULLTEXT search backend: '
+                'compressed bodies are not in notes.content, so content search would skip them. '
+                'Set NOTE_COMPRESSION_THRESHOLD=0 or SEARCH_BACKEND=memory.'
+            )
+
+    @property
+    def backend(self):
+        state = current_app.extensions['search_index']
+        if state['backend'] is None:
+            with state['lock']:
+                if state['backend'] is None:
+                    state['backend'] = self._resolve_backend()
+        return state['backend']
+
+    def _resolve_backend(self):
+        config = current_app.config
+        choice = config['SEARCH_BACKEND']
+        if choice == 'auto':
+            choice = db.engine.dialect.name
+
+        backend = None
+        if choice == 'mysql':
+            backend = MySQLFulltextBackend()
+        elif choice == 'sqlite':
+            backend = SQLiteFTS5Backend()
+
+        if backend is not None and not backend.is_available():
+            logger.warning('Full-text index for %s is unavailable, using the in-process index', choice)
+            backend = None
+
+        if backend is None:
+            backend = InvertedIndexBackend(
+                refresh_interval=config['SEARCH_INDEX_REFRESH'],
+                max_hits=config['SEARCH_MAX_HITS'],
+            )
+        return backend
+
+    @property
+    def maintains_itself(self):
+        return self.backend.maintains_itself
+
+    def index_notes(self, notes):
+        self.backend.index_notes(notes)
+
+    def remove_notes(self, note_ids):
+        self.backend.remove_notes(note_ids)
+
+    def filter(self, query, term, content_visible, rank=True):
+        """Restrict a Note query to matches for ``term``, best matches first when ``rank``.
+
+        ``content_visible`` is a SQL condition; rows where it is false can only
+        match on their title. A term with no words in it (``!!!``) matches nothing.
+        """
+        terms = query_terms(term)
+        if not terms:
+            return query if not term.strip() else query.filter(db.false())
+        return self.backend.filter(query, terms, content_visible, rank=rank)
+
+
+search_index = SearchIndex()
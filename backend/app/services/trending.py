@@ -0,0 +1,148 @@
+"""Trending notes: favorite counts decayed over time, kept ranked in a table.
+
+Each trending period (``24h``, ``7d``) has a half-life; a favorite counts
+``2 ** -(age / half_life)`` and only while it is younger than the period.
+Decaying every stored score as time passes would mean rewriting the whole
+ranking, so scores are kept against a fixed ``epoch`` instead: a favorite
+made at ``t`` adds ``2 ** ((t - epoch) / half_life)``. Every score of a
+period shrinks by the same factor as time goes on, so their order is the
+trending order, and ``note_trending_scores`` can be walked through its
+``(period, score, note_id)`` index for any page.
+
+- Favoriting adds its weight to the note's row (one upsert), unfavoriting
+  subtracts it again; both happen in the favorite's own transaction.
+- ``refresh`` (``flask notes refresh-trending``) rebuilds a period from the
+  favorites still inside it with the epoch set to now. This drops favorites
+  that aged out and keeps the weights small, so run it every few minutes
+  (the ``trending_refresher`` compose service does, every 5).
+  A favorite toggled while a refresh is running may be counted with the
+  old epoch; the next refresh puts it right.
+- Favorite updates skip a period without a ``trending_windows`` row (its
+  epoch); migration ``0010_seed_trending_windows`` creates both.
+
+The ``all`` period is plain favorite counts, served by the popular order
+of ``notes`` itself.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, delete, insert, update
+
+from app import db
+from app.models.favorite import Favorite
+from app.models.note import Note
+from app.models.trending import TrendingScore, TrendingWindow
+
+# period -> (window, half-life)
+PERIODS = {
+    '24h': (timedelta(hours=24), timedelta(hours=6)),
+    '7d': (timedelta(days=7), timedelta(days=1)),
+}
+WINDOWS = (*PERIODS, 'all')
+
+# A favorite inside its period weighs at least 2 ** -7 after a refresh, so
+# anything below this is float residue of favorites that were removed
+MIN_SCORE = 1e-3
+# 2 ** 1000 is still a finite float; only reached when refresh has not run for months
+MAX_EXPONENT = 1000
+
+
+def favorited_now():
+    """Timestamp for a new favorite, in whole seconds so MySQL DATETIME stores it exactly.
+
+    Unfavoriting subtracts the weight of the stored ``created_at``, which must
+    match what was added.
+    """
+    return datetime.utcnow().replace(microsecond=0)
+
+
+def weight(at, epoch, half_life):
+    exponent = (at - epoch) / half_life
+    return 2.0 ** min(exponent, MAX_EXPONENT)
+
+
+def _epochs():
+    return dict(db.session.query(TrendingWindow.period, TrendingWindow.epoch).all())
+
+
+def _upsert_add(rows):
+    """Add each row's score to the existing one, inserting missing rows."""
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as upsert
+        stmt = upsert(TrendingScore).values(rows)
+        stmt = stmt.on_duplicate_key_update(score=TrendingScore.score + stmt.inserted.score)
+    else:
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        stmt = upsert(TrendingScore).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=['note_id', 'period'],
+                                          set_={'score': TrendingScore.score + stmt.excluded.score})
+    db.session.execute(stmt)
+
+
+def favorites_added(note_ids, at):
+    """Count new favorites (made at ``at``) of these notes. Call before committing them."""
+    if not note_ids:
+        return
+    rows = [
+        {'note_id': note_id, 'period': period, 'score': weight(at, epoch, PERIODS[period][1])}
+        for period, epoch in _epochs().items() if period in PERIODS
+        for note_id in note_ids
+    ]
+    if rows:
+        _upsert_add(rows)
+
+
+def favorites_removed(favorites):
+    """Uncount removed favorites, given as ``(note_id, created_at)`` pairs. Call before committing."""
+    if not favorites:
+        return
+    rows = []
+    for period, epoch in _epochs().items():
+        if period not in PERIODS:
+            continue
+        window, half_life = PERIODS[period]
+        # Favorites older than this were not part of the last refresh
+        since = epoch - window
+        rows.extend({'b_note_id': note_id, 'b_period': period, 'b_score': weight(created_at, epoch, half_life)}
+                    for note_id, created_at in favorites if created_at is not None and created_at >= since)
+    if rows:
+        db.session.execute(
+            update(TrendingScore.__table__)
+            .where(TrendingScore.note_id == bindparam('b_note_id'), TrendingScore.period == bindparam('b_period'))
+            .values(score=TrendingScore.score - bindparam('b_score')),
+            rows,
+        )
+
+
+def refresh(period, now=None, batch_size=1000):
+    """Rebuild a period's scores from its favorites, in one transaction. Returns the number of notes."""
+    window, half_life = PERIODS[period]
+    now = now or datetime.utcnow()
+
+    scores = defaultdict(float)
+    favorites = db.session.query(Favorite.note_id, Favorite.created_at)\
+        .filter(Favorite.created_at >= now - window)\
+        .yield_per(batch_size)
+    for note_id, created_at in favorites:
+        scores[note_id] += weight(created_at, now, half_life)
+
+    db.session.execute(delete(TrendingScore).where(TrendingScore.period == period))
+    rows = [{'note_id': note_id, 'period': period, 'score': score} for note_id, score in scores.items()]
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(insert(TrendingScore), rows[start:start + batch_size])
+    db.session.merge(TrendingWindow(period=period, epoch=now, refreshed_at=datetime.utcnow()))
+    db.session.commit()
+    return len(rows)
+
+
+def feed_query(period):
+    """``(Note, score)`` rows of a period's visible trending notes, for ``paginate``."""
+    return db.session.query(Note, TrendingScore.score)\
+        .join(TrendingScore, TrendingScore.note_id == Note.id)\
+        .filter(TrendingScore.period == period,
+                TrendingScore.score > MIN_SCORE,
+                Note.visibility.in_(['public', 'protected']))
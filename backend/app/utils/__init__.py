@@ -1,8 +1,9 @@
 import jwt
-import os
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
+from app.services.metrics import timed
+from app.utils.tokens import token_verifier
 
 
 def generate_token(user_id):
@@ -11,7 +12,7 @@ def generate_token(user_id):
         'exp': datetime.utcnow() + timedelta(days=7),
         'iat': datetime.utcnow()
     }
-    return jwt.encode(payload, os.getenv('JWT_SECRET_KEY', 'jwt-secret'), algorithm='HS256')
+    return token_verifier.encode(payload)
 
 
 def token_required(f):
@@ -27,8 +28,8 @@ def token_required(f):
             return jsonify({'error': 'Token is missing'}), 401
 
         try:
-            payload = jwt.decode(token, os.getenv('JWT_SECRET_KEY', 'jwt-secret'), algorithms=['HS256'])
-            current_user_id = payload['user_id']
+            with timed('auth'):
+                current_user_id = token_verifier.user_id(token)
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Token has expired'}), 401
         except jwt.InvalidTokenError:
@@ -52,10 +53,15 @@ def optional_token(f):
         current_user_id = None
         if token:
             try:
-                payload = jwt.decode(token, os.getenv('JWT_SECRET_KEY', 'jwt-secret'), algorithms=['HS256'])
-                current_user_id = payload['user_id']
+                with timed('auth'):
+                    payload = token_verifier.decode(token)
             except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
-                pass
+                payload = None
+            if payload is not None:
+                # Signed by us but not a login token: reject rather than serve it anonymously
+                current_user_id = payload.get('user_id')
+                if type(current_user_id) is not int:
+                    return jsonify({'error': 'Invalid token'}), 401
 
         return f(current_user_id, *args, **kwargs)
 
@@ -0,0 +1,67 @@
+"""ETag helpers for conditional GET and optimistic concurrency on notes.
+
+A note detail ETag is strong and has two parts, ``"<version>.<variant>"``.
+``version`` identifies the stored note (id + last edit + content hash), ``variant`` covers
+what differs per viewer (favorite flag and count, content unlocked, author).
+``If-Match`` on writes only compares the version part, so a favorite
+toggle by someone else does not count as an edit conflict.
+"""
+import hashlib
+from flask import request, make_response
+
+
+def _digest(*parts):
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()[:16]
+
+
+def note_version(note):
+    updated = note.updated_at.isoformat() if note.updated_at else ''
+    return _digest(note.id, updated, note.title, note.content_hash or '')
+
+
+def note_etag(note, is_favorited, content_unlocked):
+    author = note.author
+    variant = _digest(
+        note.favorite_count, int(is_favorited), int(content_unlocked), note.visibility,
+        author.username if author else '', author.avatar if author else '',
+    )
+    return f'{note_version(note)}.{variant}'
+
+
+def list_etag(rows, favorited_ids, meta):
+    """Weak ETag for a page, from (id, updated_at iso, favorite_count) rows of the page."""
+    return _digest(
+        request.full_path,
+        ','.join(f'{note_id}:{updated}:{count}' for note_id, updated, count in rows),
+        ','.join(str(note_id) for note_id in sorted(favorited_ids)),
+        sorted(meta.items()),
+    )
+
+
+def note_rows(notes):
+    return [(n.id, n.updated_at.isoformat() if n.updated_at else None, n.favorite_count) for n in notes]
+
+
+def not_modified(etag, weak=False):
+    """A 304 response if the request's If-None-Match matches ``etag``, else None."""
+    matches = request.if_none_match.contains_weak(etag) if weak else request.if_none_match.contains(etag)
+    if not matches:
+        return None
+    response = make_response('', 304)
+    return with_etag(response, etag, weak=weak)
+
+
+def with_etag(response, etag, weak=False):
+    response.set_etag(etag, weak=weak)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.update(('Authorization', 'X-Note-Grant'))
+    return response
+
+
+def if_match_fails(note):
+    """True if the request carries If-Match and none of its tags matches the note's version."""
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return False
+    version = note_version(note)
+    return not any(tag.split('.')[0] == version for tag in if_match.as_set())
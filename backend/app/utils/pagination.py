@@ -0,0 +1,107 @@
+import base64
+import json
+import math
+from datetime import datetime
+from flask import request, current_app
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def get_per_page(default=20):
+    """Read ``per_page`` from the query string, clamped to 1..MAX_PER_PAGE."""
+    per_page = request.args.get('per_page', default, type=int) or default
+    return max(1, min(per_page, current_app.config['MAX_PER_PAGE']))
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _cursor_value(value, column):
+    """A decoded cursor position as the column's Python type; ValueError for anything else.
+
+    Cursors come from the client, so nothing but the expected scalar may reach the driver.
+    Keys are built from stored rows, whose order columns are always filled, so
+    ``null`` is rejected too: ``column < None`` cannot be compiled.
+    """
+    if value is None:
+        raise ValueError
+    expected = column.type.python_type
+    if expected is datetime:
+        if not isinstance(value, str):
+            raise ValueError
+        return datetime.fromisoformat(value)
+    if expected is int:
+        if type(value) is not int or not -2 ** 63 <= value < 2 ** 63:
+            raise ValueError
+        return value
+    if expected is float:
+        if type(value) not in (int, float) or not math.isfinite(value):
+            raise ValueError
+        return float(value)
+    if expected is str and isinstance(value, str):
+        return value
+    raise ValueError
+
+
+def decode_cursor(cursor, columns):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [_cursor_value(v, column) for v, column in zip(values, columns)]
+    except (ValueError, TypeError, UnicodeError, NotImplementedError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def _after(columns, values):
+    """Rows strictly after ``values`` in ``ORDER BY columns DESC``, as an expanded OR of ANDs."""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, column < values[i]))
+    return or_(*clauses)
+
+
+def paginate(query, columns, key):
+    """Paginate ``query`` ordered by ``columns`` (all descending).
+
+    Offset mode (``?page=``) is the default and reports total/pages. Passing
+    ``?cursor=`` (empty for the first page) switches to keyset mode: no OFFSET,
+    no COUNT unless ``include_total=1``, and a ``next_cursor`` built from
+    ``key(last_item)``.
+
+    Returns ``(items, meta)`` where ``meta`` is merged into the response body.
+    """
+    per_page = get_per_page()
+    ordered = query.order_by(*[column.desc() for column in columns])
+
+    if 'cursor' not in request.args:
+        page = request.args.get('page', 1, type=int)
+        pagination = ordered.paginate(page=page, per_page=per_page, error_out=False)
+        return pagination.items, {
+            'total': pagination.total,
+            'pages': pagination.pages,
+            'current_page': page,
+        }
+
+    cursor = request.args.get('cursor', '', type=str).strip()
+    if cursor:
+        ordered = ordered.filter(_after(columns, decode_cursor(cursor, columns)))
+
+    items = ordered.limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    meta = {
+        'next_cursor': encode_cursor(key(items[-1])) if has_more else None,
+        'per_page': per_page,
+    }
+    if request.args.get('include_total', type=int):
+        meta['total'] = query.order_by(None).count()
+    return items, meta
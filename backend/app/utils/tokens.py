@@ -0,0 +1,102 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from flask import current_app
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of tokens whose signature has already been checked.
+
+    Keyed by the token's SHA-256 digest, so raw tokens are never kept in
+    memory. An entry lives until the earlier of the token's ``exp`` and
+    ``ttl`` seconds after it was cached.
+    """
+
+    def __init__(self, maxsize=4096, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at <= now:
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return payload
+
+    def set(self, digest, payload):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if 'exp' in payload:
+            expires_at = min(expires_at, payload['exp'])
+        with self._lock:
+            self._entries[digest] = (payload, expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TokenVerifier:
+    """Encodes and verifies auth JWTs with the secret/algorithm resolved once per app."""
+
+    def init_app(self, app):
+        app.config.setdefault('JWT_ALGORITHM', os.getenv('JWT_ALGORITHM', 'HS256'))
+        app.config.setdefault('JWT_CACHE_SIZE', int(os.getenv('JWT_CACHE_SIZE', 4096)))
+        app.config.setdefault('JWT_CACHE_TTL', int(os.getenv('JWT_CACHE_TTL', 300)))
+        app.extensions['token_verifier'] = {
+            'secret': app.config['JWT_SECRET_KEY'],
+            'algorithm': app.config['JWT_ALGORITHM'],
+            'cache': VerifiedTokenCache(app.config['JWT_CACHE_SIZE'], app.config['JWT_CACHE_TTL']),
+        }
+
+    @property
+    def _state(self):
+        return current_app.extensions['token_verifier']
+
+    @property
+    def cache(self):
+        return self._state['cache']
+
+    def encode(self, payload):
+        state = self._state
+        return jwt.encode(payload, state['secret'], algorithm=state['algorithm'])
+
+    def decode(self, token):
+        """Return the verified payload, raising ``jwt.InvalidTokenError`` like ``jwt.decode``."""
+        state = self._state
+        digest = hashlib.sha256(token.encode('utf-8')).digest()
+        payload = state['cache'].get(digest)
+        if payload is None:
+            payload = jwt.decode(token, state['secret'], algorithms=[state['algorithm']])
+            state['cache'].set(digest, payload)
+        return payload
+
+    def user_id(self, token):
+        """The ``user_id`` of a verified login token.
+
+        Raises ``jwt.InvalidTokenError`` for a validly signed payload that is not
+        a login token (no integer ``user_id``), so callers answer 401, not 500.
+        """
+        user_id = self.decode(token).get('user_id')
+        if type(user_id) is not int:
+            raise jwt.InvalidTokenError('Token has no user_id')
+        return user_id
+
+
+token_verifier = TokenVerifier()
@@ -0,0 +1,59 @@
+VISIBILITIES = ('public', 'private', 'protected')
+TITLE_MAX_LENGTH = 200
+
+
+def validate_note_data(data):
+    """Validate a create-note payload.
+
+    Returns ``(fields, None)`` with cleaned title/content/visibility/password,
+    or ``(None, error_message)``.
+    """
+    if not data or not isinstance(data, dict):
+        return None, 'No data provided'
+
+    title = data.get('title', '')
+    content = data.get('content', '')
+    visibility = data.get('visibility', 'public')
+    password = data.get('password', None)
+
+    title = title.strip() if isinstance(title, str) else ''
+    content = content.strip() if isinstance(content, str) else ''
+
+    if not title or not content:
+        return None, 'Title and content are required'
+
+    if len(title) > TITLE_MAX_LENGTH:
+        return None, f'Title must be at most {TITLE_MAX_LENGTH} characters'
+
+    if visibility not in VISIBILITIES:
+        return None, 'Invalid visibility type'
+
+    if visibility == 'protected' and not password:
+        return None, 'Password is required for protected notes'
+
+    if password is not None and not isinstance(password, str):
+        return None, 'Invalid password'
+
+    return {
+        'title': title,
+        'content': content,
+        'visibility': visibility,
+        'password': password if visibility == 'protected' else None,
+    }, None
+
+
+def validate_batch(data, key, limit):
+    """Return ``(items, None)`` for the list under ``key`` in a batch payload, or ``(None, error_message)``."""
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, f'{key} must be a non-empty list'
+
+    if len(items) > limit:
+        return None, f'At most {limit} items per batch'
+
+    return items, None
+
+
+def is_note_id(value):
+    """True for an integer id from a JSON body; JSON ``true``/``false`` are not ids."""
+    return isinstance(value, int) and not isinstance(value, bool)
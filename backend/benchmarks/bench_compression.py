@@ -0,0 +1,107 @@
+"""Storage size and read latency of note bodies at different compression thresholds.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_compression [--notes 300] [--reads 300] [--codec zlib]
+
+For each threshold a fresh in-memory SQLite database is filled with the same
+synthetic notes (sizes from a few hundred bytes up to ~1MB of text-like
+content). "stored" is the bytes in notes.content + notes.content_compressed,
+"detail" the time to load one note and read its full body, and "list" the
+time to load and serialize a 20-note page, which must not depend on the
+threshold since list views never touch the body.
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+from sqlalchemy import func  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models.note import Note  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+THRESHOLDS = (0, 1024, 16 * 1024, 256 * 1024)
+WORDS = ('catatan', 'note', 'meeting', 'ide', 'project', 'deadline', 'review', 'draft',
+         'the', 'and', 'untuk', 'yang', 'dengan', 'data', 'server', 'client', 'api', 'release')
+
+
+def synthetic_bodies(count, seed=7):
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(count):
+        size = int(min(rng.lognormvariate(8, 2), 1024 * 1024))
+        words = []
+        length = 0
+        while length < size:
+            word = rng.choice(WORDS) if rng.random() < 0.9 else f'{rng.randrange(10 ** 6)}'
+            words.append(word)
+            length += len(word) + 1
+        bodies.append(' '.join(words))
+    return bodies
+
+
+def measure(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e3
+
+
+def run(threshold, codec, bodies, reads):
+    os.environ['NOTE_COMPRESSION_THRESHOLD'] = str(threshold)
+    os.environ['NOTE_COMPRESSION_CODEC'] = codec
+    app = create_app()
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all(Note(title=f'Note {i}', content=body, user_id=user.id) for i, body in enumerate(bodies))
+        db.session.commit()
+
+        stored = db.session.query(
+            func.sum(func.length(func.cast(Note._content, db.LargeBinary))
+                     + func.coalesce(func.length(Note.content_compressed), 0))
+        ).scalar()
+        compressed = Note.query.filter(Note.content_compressed.isnot(None)).count()
+
+        rng = random.Random(11)
+        ids = [note_id for note_id, in db.session.query(Note.id)]
+
+        def detail():
+            db.session.expunge_all()
+            db.session.get(Note, rng.choice(ids)).content
+
+        def page():
+            db.session.expunge_all()
+            notes = Note.query.order_by(Note.created_at.desc()).limit(20).all()
+            [note.to_dict(include_content=False) for note in notes]
+
+        detail_ms = measure(detail, reads)
+        list_ms = measure(page, reads)
+        db.drop_all()
+    return stored, compressed, detail_ms, list_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=300)
+    parser.add_argument('--reads', type=int, default=300)
+    parser.add_argument('--codec', choices=('zlib', 'zstd'), default='zlib')
+    args = parser.parse_args()
+
+    bodies = synthetic_bodies(args.notes)
+    raw = sum(len(body.encode('utf-8')) for body in bodies)
+    print(f'{args.notes} notes, {raw / 1024 / 1024:.1f} MB of content, codec {args.codec}')
+    print(f"{'threshold':>10} {'compressed':>10} {'stored MB':>10} {'ratio':>6} {'detail ms':>10} {'list ms':>8}")
+    for threshold in THRESHOLDS:
+        stored, compressed, detail_ms, list_ms = run(threshold, args.codec, bodies, args.reads)
+        label = 'off' if threshold == 0 else f'{threshold // 1024}KB'
+        print(f'{label:>10} {compressed:>10} {stored / 1024 / 1024:>10.2f} {stored / raw:>6.2f} '
+              f'{detail_ms:>10.3f} {list_ms:>8.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""Latency, throughput and SQL queries per request for every blueprint's endpoints.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_endpoints [--mode client|http|both] [--notes 2000] [--users 50]
+                                         [--requests 200] [--concurrency 8]
+                                         [--compare benchmarks/baseline.json] [--save-baseline PATH]
+
+A temporary SQLite database is seeded with ``benchmarks.dataset``. "client"
+mode calls each endpoint sequentially through the Flask test client; "http"
+mode serves the app on a local threaded server and sends the requests from
+``--concurrency`` threads. Each row reports p50/p95/p99 latency (ms),
+requests per second and SQL queries per request.
+
+With ``--compare`` a scenario is a regression if its p95 grew by more than
+``--tolerance`` (and by at least 2ms), or if it issues more queries per
+request than the baseline. A scenario missing from the baseline fails too:
+save a new baseline along with a change that adds scenarios or changes query
+counts. The exit status is 1 when there is one, so the script can gate CI. Latencies are machine dependent; refresh the stored
+baseline with ``--save-baseline`` when the benchmark machine changes.
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_db_file = tempfile.NamedTemporaryFile(prefix='bench-', suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_file.name}'
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')  # the login scenarios repeat one account
+
+from sqlalchemy import event  # noqa: E402
+from werkzeug.serving import WSGIRequestHandler, make_server  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models.note import Note  # noqa: E402
+from app.utils import generate_token  # noqa: E402
+from benchmarks.dataset import PASSWORD, seed_dataset  # noqa: E402
+
+NOISE_FLOOR_MS = 2.0
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def scenarios(app):
+    """Return [(name, method, path, headers, json body)] covering every blueprint."""
+    with app.app_context():
+        owner_id = db.session.query(Note.user_id).group_by(Note.user_id)\
+            .order_by(db.func.count(Note.id).desc()).first()[0]
+        own = Note.query.filter_by(user_id=owner_id, visibility='public').first()
+        public = Note.query.filter(Note.visibility == 'public', Note.user_id != owner_id)\
+            .order_by(Note.favorite_count.desc()).first()
+        protected = Note.query.filter_by(visibility='protected').first()
+        headers = {'Authorization': f'Bearer {generate_token(owner_id)}', 'Content-Type': 'application/json'}
+        email = f'user{owner_id - 1}@example.com'
+
+    anon = {'Content-Type': 'application/json'}
+    return [
+        ('auth: login', 'POST', '/api/auth/login', anon, {'email': email, 'password': PASSWORD}),
+        ('auth: me', 'GET', '/api/auth/me', headers, None),
+        ('notes: explore', 'GET', '/api/notes', anon, None),
+        ('notes: explore page 10', 'GET', '/api/notes?page=10', anon, None),
+        ('notes: explore popular', 'GET', '/api/notes?sort=popular', headers, None),
+        ('notes: explore cursor', 'GET', '/api/notes?cursor=', headers, None),
+        ('notes: search', 'GET', '/api/notes?search=apple', anon, None),
+        ('notes: my', 'GET', '/api/notes/my', headers, None),
+        ('notes: shared', 'GET', '/api/notes/shared?cursor=', headers, None),
+        ('notes: trending 24h', 'GET', '/api/notes/trending?window=24h&cursor=', anon, None),
+        ('notes: trending 7d', 'GET', '/api/notes/trending?window=7d&cursor=', headers, None),
+        ('notes: trending all', 'GET', '/api/notes/trending?window=all&cursor=', headers, None),
+        ('notes: detail', 'GET', f'/api/notes/{public.id}', headers, None),
+        ('notes: verify password', 'POST', f'/api/notes/{protected.id}/verify-password', anon,
+         {'password': PASSWORD}),
+        ('notes: create', 'POST', '/api/notes', headers,
+         {'title': 'Benchmark note', 'content': 'benchmark ' * 50, 'visibility': 'public'}),
+        ('notes: update', 'PUT', f'/api/notes/{own.id}', headers, {'title': 'Benchmark title'}),
+        ('favorites: list', 'GET', '/api/favorites', headers, None),
+        ('favorites: toggle', 'POST', f'/api/favorites/{public.id}', headers, None),
+        ('contributors: list', 'GET', f'/api/notes/{own.id}/contributors', headers, None),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, queries, errors):
+    values = sorted(latencies)
+    return {
+        'p50': percentile(values, 0.50) * 1e3,
+        'p95': percentile(values, 0.95) * 1e3,
+        'p99': percentile(values, 0.99) * 1e3,
+        'rps': len(values) / elapsed if elapsed else 0.0,
+        'queries': queries / len(values),
+        'errors': errors,
+    }
+
+
+def run_client(app, counter, scenario, requests):
+    name, method, path, headers, body = scenario
+    client = app.test_client()
+    for _ in range(min(10, requests)):  # warm caches, connections and the search index
+        client.open(path, method=method, headers=headers, json=body)
+
+    latencies = []
+    errors = 0
+    counter.count = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.open(path, method=method, headers=headers, json=body)
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code >= 400
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, counter.count, errors)
+
+
+def run_http(port, counter, scenario, requests, concurrency):
+    name, method, path, headers, body = scenario
+    payload = json.dumps(body) if body is not None else None
+
+    def send():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        try:
+            start = time.perf_counter()
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return time.perf_counter() - start, response.status >= 400
+        finally:
+            conn.close()
+
+    for _ in range(min(10, requests)):
+        send()
+
+    counter.count = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: send(), range(requests)))
+    elapsed = time.perf_counter() - started
+    return summarize([latency for latency, _ in results], elapsed, counter.count,
+                     sum(failed for _, failed in results))
+
+
+def compare(mode, results, baseline, tolerance):
+    """Print the delta to the baseline; return the names of regressed scenarios."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(mode, {}).get(name)
+        if not base:
+            # A new scenario would otherwise never be checked
+            print(f'  {name:<28} not in the baseline, refresh it with --save-baseline  MISSING')
+            regressions.append(name)
+            continue
+        slower = result['p95'] > base['p95'] * (1 + tolerance) and result['p95'] - base['p95'] >= NOISE_FLOOR_MS
+        more_queries = result['queries'] > base['queries'] + 0.01
+        change = (result['p95'] - base['p95']) / base['p95'] * 100 if base['p95'] else 0.0
+        flag = 'REGRESSION' if slower or more_queries else ''
+        print(f'  {name:<28} p95 {base["p95"]:8.2f} -> {result["p95"]:8.2f} ms ({change:+6.1f}%)  '
+              f'queries {base["queries"]:5.1f} -> {result["queries"]:5.1f}  {flag}')
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def print_table(mode, results):
+    print(f'\n[{mode}]')
+    print(f"  {'scenario':<28} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'queries':>8} {'errors':>6}")
+    for name, r in results.items():
+        print(f"  {name:<28} {r['p50']:8.2f} {r['p95']:8.2f} {r['p99']:8.2f} {r['rps']:8.1f} "
+              f"{r['queries']:8.1f} {r['errors']:6d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=('client', 'http', 'both'), default='both')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--notes', type=int, default=2000)
+    parser.add_argument('--favorites-per-user', type=int, default=40)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Client threads in http mode.')
+    parser.add_argument('--compare', help='Baseline JSON to compare against.')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed p95 growth (0.5 = 50%%).')
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file.')
+    args = parser.parse_args()
+
+    app = create_app()
+    counter = QueryCounter()
+    with app.app_context():
+        counts = seed_dataset(users=args.users, notes=args.notes, favorites_per_user=args.favorites_per_user)
+        event.listen(db.engine, 'before_cursor_execute', counter)
+    print('dataset: ' + ', '.join(f'{value} {key}' for key, value in counts.items()))
+
+    plan = scenarios(app)
+    modes = ('client', 'http') if args.mode == 'both' else (args.mode,)
+    all_results = {}
+    for mode in modes:
+        results = {}
+        if mode == 'client':
+            for scenario in plan:
+                results[scenario[0]] = run_client(app, counter, scenario, args.requests)
+        else:
+            server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                for scenario in plan:
+                    results[scenario[0]] = run_http(server.port, counter, scenario, args.requests, args.concurrency)
+            finally:
+                server.shutdown()
+        all_results[mode] = results
+        print_table(mode, results)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for mode, results in all_results.items():
+            print(f'\n[{mode}] vs {args.compare}')
+            regressions += compare(mode, results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(all_results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nbaseline written to {args.save_baseline}')
+
+    os.unlink(_db_file.name)
+    if regressions:
+        print(f'\n{len(regressions)} regressions: ' + ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
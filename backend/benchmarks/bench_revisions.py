@@ -0,0 +1,120 @@
+"""Storage growth and reconstruction latency of the note revision history.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_revisions [--edits 500] [--lines 200] [--intervals 1,10,20,50]
+
+A note of ``--lines`` lines goes through ``--edits`` small edits (a line
+changed, inserted or removed, as a typical save would), each recorded with
+``app.services.revisions.record_edit``. This is repeated for each keyframe
+interval; an interval of 1 stores every revision as a full compressed
+snapshot, which is the baseline deltas are compared with.
+
+Each row reports the bytes stored for the whole chain, bytes per revision,
+the ratio to uncompressed full snapshots, the time to record an edit, and
+the median / worst time to rebuild a revision (the worst case is the one
+right before a keyframe).
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+
+from flask import current_app  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models.note import Note  # noqa: E402
+from app.models.revision import NoteRevision  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.revisions import record_edit, revision_content  # noqa: E402
+from benchmarks.dataset import WORDS  # noqa: E402
+
+
+def random_line(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 14)))
+
+
+def edit(rng, lines):
+    lines = lines[:]
+    action = rng.random()
+    position = rng.randrange(len(lines))
+    if action < 0.6:
+        lines[position] = random_line(rng)
+    elif action < 0.85 or len(lines) < 10:
+        lines.insert(position, random_line(rng))
+    else:
+        del lines[position]
+    return lines
+
+
+def run_chain(user_id, interval, edits, line_count, seed):
+    current_app.config['REVISION_KEYFRAME_INTERVAL'] = interval
+
+    rng = random.Random(seed)
+    lines = [random_line(rng) for _ in range(line_count)]
+    note = Note(title=f'interval {interval}', content='\n'.join(lines), visibility='public', user_id=user_id)
+    db.session.add(note)
+    db.session.commit()
+
+    versions = [note.content]
+    record_times = []
+    for _ in range(edits):
+        old_content = note.content
+        lines = edit(rng, lines)
+        note.content = '\n'.join(lines)
+        start = time.perf_counter()
+        record_edit(note, note.title, old_content, user_id)
+        db.session.commit()
+        record_times.append(time.perf_counter() - start)
+        versions.append(note.content)
+
+    stored = db.session.query(func.sum(func.length(NoteRevision.data)), func.count(NoteRevision.id))\
+        .filter(NoteRevision.note_id == note.id).one()
+    raw = sum(len(version.encode('utf-8')) for version in versions)
+
+    rebuild_times = []
+    for number in range(1, len(versions) + 1):
+        start = time.perf_counter()
+        content = revision_content(note.id, number)
+        rebuild_times.append(time.perf_counter() - start)
+        assert content == versions[number - 1], f'revision {number} does not round-trip'
+
+    return {
+        'bytes': stored[0],
+        'per_revision': stored[0] / stored[1],
+        'ratio': stored[0] / raw,
+        'record_ms': statistics.median(record_times) * 1e3,
+        'rebuild_p50_ms': statistics.median(rebuild_times) * 1e3,
+        'rebuild_max_ms': max(rebuild_times) * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--edits', type=int, default=500)
+    parser.add_argument('--lines', type=int, default=200, help='Lines in the note (about 60 bytes each).')
+    parser.add_argument('--intervals', default='1,10,20,50', help='Keyframe intervals to compare.')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+
+        print(f'{args.edits} edits of a {args.lines}-line note, every revision rebuilt and verified\n')
+        print(f"{'interval':>8} {'stored':>12} {'B/rev':>8} {'vs raw':>7} {'record':>8} "
+              f"{'rebuild p50':>12} {'rebuild max':>12}")
+        for interval in [int(value) for value in args.intervals.split(',')]:
+            r = run_chain(user.id, interval, args.edits, args.lines, args.seed)
+            print(f"{interval:>8} {r['bytes']:>12,} {r['per_revision']:>8.0f} {r['ratio']:>6.1%} "
+                  f"{r['record_ms']:>6.2f}ms {r['rebuild_p50_ms']:>10.2f}ms {r['rebuild_max_ms']:>10.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Worker startup cost: import, app factory and first-request latency.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_startup [--runs 5]
+
+Every run is a fresh interpreter (as a new gunicorn worker or CLI command
+would be) against a temporary SQLite database created and stamped at the
+migrations head. Three startup modes are compared:
+
+- ``create_all``: ``DB_CREATE_ALL=1``, the old behaviour of reflecting and
+  creating tables inside ``create_app``;
+- ``migrations``: the default, nothing touches the database until the first
+  request, which also runs the schema version check (``SCHEMA_CHECK=warn``);
+- ``migrations, no check``: as above with ``SCHEMA_CHECK=off``.
+
+Each row reports the median time (ms) to ``import app``, to run
+``create_app()``, for the first ``GET /api/notes`` and for the one after it,
+plus the number of database connections opened by ``create_app`` itself.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = '''
+import json, time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+connections = []
+event.listen(Pool, 'connect', lambda *args: connections.append(1))
+import app as app_module
+imported = time.perf_counter()
+app = app_module.create_app()
+created = time.perf_counter()
+factory_connections = len(connections)
+client = app.test_client()
+response = client.get('/api/notes')
+first = time.perf_counter()
+assert response.status_code == 200, response.status_code
+client.get('/api/notes')
+second = time.perf_counter()
+print(json.dumps({'import': imported - started, 'factory': created - imported, 'first': first - created,
+                  'second': second - first, 'connections': factory_connections}))
+'''
+
+MODES = {
+    'create_all': {'DB_CREATE_ALL': '1', 'SCHEMA_CHECK': 'off'},
+    'migrations': {'DB_CREATE_ALL': '0', 'SCHEMA_CHECK': 'warn'},
+    'migrations, no check': {'DB_CREATE_ALL': '0', 'SCHEMA_CHECK': 'off'},
+}
+
+
+def prepare_database(path):
+    """Create the schema and stamp it at the migrations head, as ``flask db upgrade`` would leave it."""
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['DB_CREATE_ALL'] = '1'
+    from flask_migrate import stamp
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        stamp()
+
+
+def probe(env):
+    result = subprocess.run([sys.executable, '-c', PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per mode.')
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(prefix='bench-startup-', suffix='.db', delete=False)
+    try:
+        prepare_database(db_file.name)
+        print(f"{'mode':<22} {'import':>8} {'factory':>8} {'1st req':>8} {'2nd req':>8} {'conns':>6}")
+        for name, overrides in MODES.items():
+            env = {**os.environ, 'DATABASE_URL': f'sqlite:///{db_file.name}', 'BCRYPT_ROUNDS': '4', **overrides}
+            runs = [probe(env) for _ in range(args.runs)]
+            median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(f"{name:<22} {median['import'] * 1e3:8.1f} {median['factory'] * 1e3:8.1f} "
+                  f"{median['first'] * 1e3:8.1f} {median['second'] * 1e3:8.1f} {median['connections']:6.0f}")
+    finally:
+        os.unlink(db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Check that a login burst is shed with 503 before it takes every request thread.
+
+Run from the backend directory:
+
+    python -m benchmarks.check_hashing_admission [--rounds 12]
+
+Uses the shipped settings: the request threads per worker come from
+``gunicorn.conf.py`` and the hashing limits from the app defaults. One
+login per request thread is started at the same moment against a temporary
+SQLite database, as a burst that fills a worker would. At most
+``HASHING_WORKERS + HASHING_MAX_PENDING`` of them may be admitted, which
+must be fewer than the threads, so the rest must be shed with 503 after
+``HASHING_QUEUE_TIMEOUT`` instead of waiting for bcrypt. A cheap read
+(``GET /api/health``) sent during the burst is timed too. Exit status 1
+if no login is shed.
+"""
+import argparse
+import os
+import runpy
+import sys
+import tempfile
+import threading
+import time
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_file.name}'
+os.environ['RATE_LIMIT_ENABLED'] = '0'  # every login uses the same account
+
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', default='12', help='BCRYPT_ROUNDS; each hash must outlast the queue timeout.')
+    args = parser.parse_args()
+    os.environ['BCRYPT_ROUNDS'] = args.rounds
+
+    from app import create_app, db
+    from app.models.user import User
+
+    threads = runpy.run_path(GUNICORN_CONF)['threads']
+    os.environ.setdefault('GUNICORN_THREADS', str(threads))
+    app = create_app()
+    config = app.config
+    admitted = config['HASHING_WORKERS'] + config['HASHING_MAX_PENDING']
+    print(f'{threads} request threads, {config["HASHING_WORKERS"]} hashing workers, '
+          f'{config["HASHING_MAX_PENDING"]} pending allowed')
+
+    with app.app_context():
+        user = User(username='burst', email='burst@example.com')
+        user.set_password('burst-password')
+        db.session.add(user)
+        db.session.commit()
+
+    start = threading.Barrier(threads + 1)
+    statuses = []
+    read_ms = []
+
+    def login():
+        client = app.test_client()
+        start.wait()
+        response = client.post('/api/auth/login', json={'email': 'burst@example.com', 'password': 'burst-password'})
+        statuses.append(response.status_code)
+
+    def read():
+        client = app.test_client()
+        start.wait()
+        time.sleep(0.02)  # let the logins take their slots first
+        started = time.perf_counter()
+        client.get('/api/health')
+        read_ms.append((time.perf_counter() - started) * 1e3)
+
+    workers = [threading.Thread(target=login) for _ in range(threads)] + [threading.Thread(target=read)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    shed = statuses.count(503)
+    print(f'logins: {statuses.count(200)} ok, {shed} shed with 503; read during the burst: {read_ms[0]:.1f}ms')
+
+    failures = []
+    if shed < threads - admitted:
+        failures.append(f'expected at least {threads - admitted} of {threads} logins shed with 503')
+    for failure in failures:
+        print(f'FAIL  {failure}')
+    os.unlink(_db_file.name)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""N+1 check: calls every benchmarked endpoint with the query detector in ``raise`` mode.
+
+Run from the backend directory:
+
+    python -m benchmarks.check_n_plus_one [--threshold 3] [--slow-ms 200]
+
+Seeds the synthetic dataset (``benchmarks.dataset``), then calls each
+scenario of ``benchmarks.bench_endpoints`` through the test client, then the
+batch endpoints with ``BATCH_SIZE`` items each (they change data, so they
+are not part of the repeated benchmark). An
+endpoint that runs the same statement shape more than ``--threshold`` times,
+or a statement slower than ``--slow-ms``, is reported and makes the exit
+status 1, so a new N+1 fails CI.
+"""
+import argparse
+import os
+import sys
+
+os.environ['QUERY_DETECTOR'] = 'raise'
+os.environ['FEED_CACHE_ENABLED'] = '0'
+
+from benchmarks.bench_endpoints import scenarios  # noqa: E402  (sets up a temporary database)
+from app import create_app, db  # noqa: E402
+from app.models.note import Note  # noqa: E402
+from app.services.query_detector import QueryBudgetExceeded  # noqa: E402
+from app.utils import generate_token  # noqa: E402
+from benchmarks.dataset import seed_dataset  # noqa: E402
+
+BATCH_SIZE = 50
+
+
+def batch_scenarios(app):
+    """Return [(name, method, path, headers, json body)] for the batch endpoints."""
+    with app.app_context():
+        owner_id = db.session.query(Note.user_id).group_by(Note.user_id)\
+            .order_by(db.func.count(Note.id).desc()).first()[0]
+        own_ids = [note_id for (note_id,) in db.session.query(Note.id).filter_by(user_id=owner_id)
+                   .order_by(Note.id).limit(BATCH_SIZE)]
+        other_ids = [note_id for (note_id,) in db.session.query(Note.id).filter(Note.user_id != owner_id)
+                     .order_by(Note.id).limit(BATCH_SIZE)]
+        headers = {'Authorization': f'Bearer {generate_token(owner_id)}', 'Content-Type': 'application/json'}
+    notes = [{'title': f'Batch note {i}', 'content': 'batch ' * 20,
+              'visibility': ('public', 'private', 'protected')[i % 3], 'password': 'batch-password'}
+             for i in range(BATCH_SIZE)]
+    return [
+        ('notes: batch create', 'POST', '/api/notes/batch', headers, {'notes': notes}),
+        ('favorites: batch set', 'POST', '/api/favorites/batch', headers,
+         {'note_ids': other_ids, 'favorite': True}),
+        ('favorites: batch unset', 'POST', '/api/favorites/batch', headers,
+         {'note_ids': other_ids, 'favorite': False}),
+        ('notes: batch delete', 'POST', '/api/notes/batch-delete', headers, {'ids': own_ids}),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threshold', type=int, default=3, help='Allowed repeats of one statement shape.')
+    parser.add_argument('--slow-ms', type=float, default=200)
+    parser.add_argument('--notes', type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ['QUERY_DETECTOR_THRESHOLD'] = str(args.threshold)
+    os.environ['QUERY_DETECTOR_SLOW_MS'] = str(args.slow_ms)
+    app = create_app()
+    app.testing = True  # let QueryBudgetExceeded reach us instead of becoming a 500
+    with app.app_context():
+        seed_dataset(users=20, notes=args.notes, favorites_per_user=30)
+
+    client = app.test_client()
+    failures = 0
+    for name, method, path, headers, body in scenarios(app) + batch_scenarios(app):
+        try:
+            status = client.open(path, method=method, headers=headers, json=body).status_code
+            print(f'ok    {name} (HTTP {status})')
+        except QueryBudgetExceeded as exc:
+            failures += 1
+            print(f'FAIL  {name}\n      ' + str(exc).replace('\n', '\n      '))
+
+    print(f'{failures} endpoints over the query budget')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
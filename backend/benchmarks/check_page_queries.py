@@ -0,0 +1,68 @@
+"""Check that listing endpoints run the same number of queries whatever the page size.
+
+Run from the backend directory:
+
+    python -m benchmarks.check_page_queries
+
+Seeds the synthetic dataset (``benchmarks.dataset``) and calls each listing
+endpoint with ``per_page=5`` and ``per_page=50``, in offset and cursor mode,
+counting every statement sent to the database. Serializing a page must not
+query per note (authors, favorite counts and flags are loaded for the whole
+page), so both page sizes must issue exactly the same number of queries.
+Exit status 1 if any endpoint differs.
+"""
+import os
+import sys
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ['FEED_CACHE_ENABLED'] = '0'
+
+from sqlalchemy import event  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models.favorite import Favorite  # noqa: E402
+from app.utils import generate_token  # noqa: E402
+from benchmarks.dataset import seed_dataset  # noqa: E402
+
+PAGE_SIZES = (5, 50)
+ENDPOINTS = ('/api/notes', '/api/notes/my', '/api/favorites')
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        seed_dataset(users=20, notes=1000, favorites_per_user=80)
+        # The user with the most favorites, so both page sizes come back full
+        user_id = db.session.query(Favorite.user_id).group_by(Favorite.user_id)\
+            .order_by(db.func.count(Favorite.id).desc()).first()[0]
+        headers = {'Authorization': f'Bearer {generate_token(user_id)}'}
+
+        statements = []
+        event.listen(db.engine, 'after_cursor_execute', lambda *args: statements.append(1))
+
+    client = app.test_client()
+    failures = 0
+    for path in ENDPOINTS:
+        for mode in ('page=1', 'cursor='):
+            counts = {}
+            sizes = []
+            for per_page in PAGE_SIZES:
+                statements.clear()
+                response = client.get(f'{path}?{mode}&per_page={per_page}', headers=headers)
+                assert response.status_code == 200, (path, response.status_code)
+                counts[per_page] = len(statements)
+                sizes.append(len(response.get_json()['notes']))
+            # Favorites drop private notes from a page, so pages need not be full, only different
+            assert sizes[0] < sizes[-1], f'{path}: pages of {sizes} notes do not compare page sizes'
+
+            ok = len(set(counts.values())) == 1
+            failures += not ok
+            summary = ', '.join(f'per_page={size}: {count}' for size, count in counts.items())
+            print(f"{'ok  ' if ok else 'FAIL'}  {path}?{mode} ({summary} queries)")
+
+    print(f'{failures} endpoints with queries per note')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Query-plan check for the hot endpoints: fails if any of their queries does a full table scan.
+
+Run from the backend directory:
+
+    python -m benchmarks.check_query_plans [--verbose]
+
+Seeds an in-memory SQLite database, calls each endpoint through the test
+client, records every SELECT it issues and runs ``EXPLAIN QUERY PLAN`` on it.
+A plan step that scans ``notes``, ``favorites``, ``note_contributors``,
+``users`` or ``note_trending_scores`` without an index is a failure (exit
+status 1). Sorts that need a temporary B-tree are reported as warnings.
+Meant to be run in CI next to schema changes and query rewrites.
+"""
+import argparse
+import os
+import re
+import sys
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ['FEED_CACHE_ENABLED'] = '0'
+
+from sqlalchemy import event, insert  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models.contributor import NoteContributor  # noqa: E402
+from app.models.favorite import Favorite  # noqa: E402
+from app.models.note import Note, content_columns  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import trending  # noqa: E402
+from app.utils import generate_token  # noqa: E402
+
+HOT_TABLES = ('notes', 'favorites', 'note_contributors', 'users', 'note_trending_scores')
+FULL_SCAN = re.compile(r'^SCAN (\w+)\b(?! USING)')
+VISIBILITIES = ('public', 'public', 'protected', 'private')
+
+
+def seed(notes=2000, users=20):
+    db.session.execute(insert(User), [
+        {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x'} for i in range(users)
+    ])
+    db.session.execute(insert(Note), [
+        {'title': f'Note {i} apple', 'user_id': i % users + 1, 'visibility': VISIBILITIES[i % 4],
+         'favorite_count': i % 7, **content_columns(f'content {i} banana')}
+        for i in range(notes)
+    ])
+    db.session.execute(insert(Favorite), [
+        {'user_id': i % users + 1, 'note_id': i + 1} for i in range(0, notes, 3)
+    ])
+    db.session.execute(insert(NoteContributor), [
+        {'user_id': (i + 1) % users + 1, 'note_id': i + 1} for i in range(0, notes, 5)
+    ])
+    db.session.commit()
+    for period in trending.PERIODS:
+        trending.refresh(period)
+
+
+def endpoints(client, headers):
+    first = client.get('/api/notes?cursor=&per_page=20').get_json()
+    cursor = first.get('next_cursor') or ''
+    note_id = first['notes'][0]['id']
+    own_note_id = client.get('/api/notes/my', headers=headers).get_json()['notes'][0]['id']
+    return [
+        ('explore', lambda: client.get('/api/notes')),
+        ('explore page 5', lambda: client.get('/api/notes?page=5')),
+        ('explore popular', lambda: client.get('/api/notes?sort=popular')),
+        ('explore cursor', lambda: client.get(f'/api/notes?cursor={cursor}')),
+        ('explore search', lambda: client.get('/api/notes?search=apple')),
+        ('my notes', lambda: client.get('/api/notes/my', headers=headers)),
+        ('favorites', lambda: client.get('/api/favorites', headers=headers)),
+        ('shared notes', lambda: client.get('/api/notes/shared?cursor=', headers=headers)),
+        ('trending', lambda: client.get('/api/notes/trending?window=24h&cursor=', headers=headers)),
+        ('trending all', lambda: client.get('/api/notes/trending?window=all&cursor=', headers=headers)),
+        ('note detail', lambda: client.get(f'/api/notes/{note_id}', headers=headers)),
+        ('contributors', lambda: client.get(f'/api/notes/{own_note_id}/contributors', headers=headers)),
+        ('toggle favorite', lambda: client.post(f'/api/favorites/{note_id}', headers=headers)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--verbose', action='store_true', help='Print every query plan.')
+    args = parser.parse_args()
+
+    app = create_app()
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            captured.append((statement, parameters))
+
+    with app.app_context():
+        seed()
+        headers = {'Authorization': f'Bearer {generate_token(1)}'}
+        client = app.test_client()
+        client.get('/api/notes?search=warmup')  # builds the FTS table once, outside the checks
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        checks = endpoints(client, headers)
+
+        failures = warnings = 0
+        for name, call in checks:
+            captured.clear()
+            status = call().status_code
+            statements = list(captured)
+            print(f'{name}: HTTP {status}, {len(statements)} queries')
+            with db.engine.connect() as conn:
+                for statement, parameters in statements:
+                    plan = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+                    scans = [step for step in plan
+                             if (m := FULL_SCAN.match(step)) and m.group(1) in HOT_TABLES]
+                    sorts = [step for step in plan if step.startswith('USE TEMP B-TREE')]
+                    failures += len(scans)
+                    warnings += len(sorts)
+                    if args.verbose or scans or sorts:
+                        print('    ' + ' '.join(statement.split())[:160])
+                        for step in plan:
+                            flag = 'FULL SCAN ' if step in scans else 'sort      ' if step in sorts else ''
+                            print(f'      {flag}{step}')
+
+    print(f'{failures} full scans, {warnings} temp B-tree sorts')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
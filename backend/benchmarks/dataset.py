@@ -0,0 +1,107 @@
+"""Synthetic dataset for benchmarks, written with bulk inserts.
+
+Shape, all reproducible from ``seed``:
+
+- ``users`` accounts, all with the password ``PASSWORD`` (hashed once).
+- ``notes`` notes spread over the users with a skew (a few prolific
+  authors), log-normal body sizes from a few bytes to ``max_note_size``, and
+  a 60/25/15 public/private/protected mix (protected password: ``PASSWORD``).
+- favorites drawn from a Zipf-like distribution over notes, so a small
+  head of notes collects most of them; ``favorite_count`` is set to match.
+  They are spread over the last 30 days and the trending rankings are
+  built from them.
+- a contributor or two on about one note in ten.
+"""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, update
+
+from app import db
+from app.models.contributor import NoteContributor
+from app.models.favorite import Favorite
+from app.models.note import Note, content_columns
+from app.models.user import User
+from app.services import trending
+from app.services.passwords import password_hasher
+
+PASSWORD = 'bench-password'
+WORDS = ('catatan', 'note', 'meeting', 'ide', 'project', 'deadline', 'review', 'draft', 'apple', 'banana',
+         'the', 'and', 'untuk', 'yang', 'dengan', 'data', 'server', 'client', 'api', 'release')
+
+
+def text_of_size(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words) or rng.choice(WORDS)
+
+
+def seed_dataset(users=50, notes=2000, favorites_per_user=40, max_note_size=64 * 1024,
+                 batch_size=1000, seed=42):
+    """Fill an empty database; returns a dict of counts."""
+    rng = random.Random(seed)
+    password_hash = password_hasher.hash(PASSWORD)
+    start = datetime.utcnow() - timedelta(days=365)
+
+    db.session.execute(insert(User), [
+        {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': password_hash,
+         'created_at': start}
+        for i in range(users)
+    ])
+    user_ids = [user_id for user_id, in db.session.query(User.id).order_by(User.id)]
+
+    author_weights = [1 / (rank + 1) for rank in range(len(user_ids))]
+    rows = []
+    for i in range(notes):
+        visibility = rng.choices(('public', 'private', 'protected'), (60, 25, 15))[0]
+        created_at = start + timedelta(seconds=i * 365 * 86400 // max(notes, 1))
+        rows.append({
+            'title': f'{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {i}',
+            'visibility': visibility,
+            'password_hash': password_hash if visibility == 'protected' else None,
+            'user_id': rng.choices(user_ids, author_weights)[0],
+            'created_at': created_at,
+            'updated_at': created_at,
+            **content_columns(text_of_size(rng, int(min(rng.lognormvariate(6.5, 1.5), max_note_size)))),
+        })
+        if len(rows) >= batch_size:
+            db.session.execute(insert(Note), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Note), rows)
+
+    note_ids = [note_id for note_id, in db.session.query(Note.id).order_by(Note.id)]
+    popularity = [1 / (rank + 1) ** 1.1 for rank in range(len(note_ids))]
+    shuffled = note_ids[:]
+    rng.shuffle(shuffled)
+
+    favorites = []
+    now = datetime.utcnow().replace(microsecond=0)
+    for user_id in user_ids:
+        picked = set(rng.choices(shuffled, popularity, k=favorites_per_user))
+        favorites.extend({'user_id': user_id, 'note_id': note_id} for note_id in picked)
+    for i, favorite in enumerate(favorites):
+        favorite['created_at'] = now - timedelta(seconds=i * 7919 % (30 * 86400))
+    for i in range(0, len(favorites), batch_size):
+        db.session.execute(insert(Favorite), favorites[i:i + batch_size])
+
+    contributors = []
+    for note_id in rng.sample(note_ids, len(note_ids) // 10):
+        for user_id in rng.sample(user_ids, min(rng.randint(1, 2), len(user_ids))):
+            contributors.append({'note_id': note_id, 'user_id': user_id, 'created_at': start})
+    contributors = list({(c['note_id'], c['user_id']): c for c in contributors}.values())
+    if contributors:
+        db.session.execute(insert(NoteContributor), contributors)
+
+    count = select(func.count(Favorite.id)).where(Favorite.note_id == Note.id).scalar_subquery()
+    db.session.execute(update(Note).values(favorite_count=count).execution_options(synchronize_session=False))
+    db.session.commit()
+    for period in trending.PERIODS:
+        trending.refresh(period)
+
+    return {'users': len(user_ids), 'notes': len(note_ids), 'favorites': len(favorites),
+            'contributors': len(contributors)}
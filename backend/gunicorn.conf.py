@@ -0,0 +1,25 @@
+"""Gunicorn settings for the backend container (``gunicorn -c gunicorn.conf.py main:app``).
+
+The app is preloaded in the master so workers share the imported code, but
+the master never keeps database connections: ``create_app`` opens none, and
+``post_fork`` drops whatever pool a worker inherited so each one connects
+lazily on its first query.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = True
+
+
+def post_fork(server, worker):
+    from app import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: leave the parent's sockets alone, just forget them
+            engine.dispose(close=False)
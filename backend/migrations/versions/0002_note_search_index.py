@@ -0,0 +1,39 @@
+"""full-text search index over note titles and content
+
+Revision ID: 0002_note_search_index
+Revises: 0001_initial_schema
+Create Date: 2026-10-18 09:30:00.000000
+
+MySQL gets native FULLTEXT indexes, SQLite gets an FTS5 table. Other
+databases rely on the in-process inverted index in app.services.search.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_note_search_index'
+down_revision = '0001_initial_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'mysql':
+        op.execute('ALTER TABLE notes ADD FULLTEXT INDEX ft_notes_title (title)')
+        op.execute('ALTER TABLE notes ADD FULLTEXT INDEX ft_notes_title_content (title, content)')
+    elif dialect == 'sqlite':
+        op.execute('CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(title, content)')
+        op.execute('DELETE FROM notes_fts')
+        op.execute('INSERT INTO notes_fts (rowid, title, content) SELECT id, title, content FROM notes')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'mysql':
+        op.drop_index('ft_notes_title_content', table_name='notes')
+        op.drop_index('ft_notes_title', table_name='notes')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS notes_fts')
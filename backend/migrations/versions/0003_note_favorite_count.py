@@ -0,0 +1,35 @@
+"""denormalized favorite counter on notes
+
+Revision ID: 0003_note_favorite_count
+Revises: 0002_note_search_index
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_note_favorite_count'
+down_revision = '0002_note_search_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_all() may already have added the column on a fresh database
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('notes')}
+    if 'favorite_count' not in columns:
+        with op.batch_alter_table('notes') as batch_op:
+            batch_op.add_column(sa.Column('favorite_count', sa.Integer(), nullable=False, server_default='0'))
+
+    op.execute(
+        'UPDATE notes SET favorite_count = '
+        '(SELECT COUNT(*) FROM favorites WHERE favorites.note_id = notes.id), '
+        'updated_at = updated_at'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('notes') as batch_op:
+        batch_op.drop_column('favorite_count')
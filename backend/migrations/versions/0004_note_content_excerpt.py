@@ -0,0 +1,63 @@
+"""stored excerpt, length and hash of note content
+
+Revision ID: 0004_note_content_excerpt
+Revises: 0003_note_favorite_count
+Create Date: 2026-10-18 11:00:00.000000
+
+List views read these instead of the (deferred) content column. Existing
+rows are backfilled here; `flask notes backfill-excerpts` does the same for
+rows written by an older app version during a rolling deploy.
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_note_content_excerpt'
+down_revision = '0003_note_favorite_count'
+branch_labels = None
+depends_on = None
+
+EXCERPT_LENGTH = 100
+BATCH_SIZE = 500
+
+
+def upgrade():
+    bind = op.get_bind()
+    # create_all() may already have added the columns on a fresh database
+    columns = {c['name'] for c in sa.inspect(bind).get_columns('notes')}
+    with op.batch_alter_table('notes') as batch_op:
+        if 'excerpt' not in columns:
+            batch_op.add_column(sa.Column('excerpt', sa.String(EXCERPT_LENGTH), nullable=True))
+        if 'content_length' not in columns:
+            batch_op.add_column(sa.Column('content_length', sa.Integer(), nullable=True))
+        if 'content_hash' not in columns:
+            batch_op.add_column(sa.Column('content_hash', sa.String(64), nullable=True))
+
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            'SELECT id, content FROM notes WHERE id > :last_id AND content_hash IS NULL '
+            'ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        bind.execute(sa.text(
+            'UPDATE notes SET excerpt = :excerpt, content_length = :content_length, '
+            'content_hash = :content_hash, updated_at = updated_at WHERE id = :id'
+        ), [{
+            'id': note_id,
+            'excerpt': (content or '')[:EXCERPT_LENGTH],
+            'content_length': len(content or ''),
+            'content_hash': hashlib.sha256((content or '').encode('utf-8')).hexdigest(),
+        } for note_id, content in rows])
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    with op.batch_alter_table('notes') as batch_op:
+        batch_op.drop_column('content_hash')
+        batch_op.drop_column('content_length')
+        batch_op.drop_column('excerpt')
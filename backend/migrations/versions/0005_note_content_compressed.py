@@ -0,0 +1,37 @@
+"""optional compressed storage for large note bodies
+
+Revision ID: 0005_note_content_compressed
+Revises: 0004_note_content_excerpt
+Create Date: 2026-10-18 11:30:00.000000
+
+Existing rows are left as they are; `flask notes compress-content` converts
+them in batches once NOTE_COMPRESSION_THRESHOLD is set. Run it with
+--decompress before downgrading past this revision.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_note_content_compressed'
+down_revision = '0004_note_content_excerpt'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_all() may already have added the column on a fresh database
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('notes')}
+    if 'content_compressed' not in columns:
+        with op.batch_alter_table('notes') as batch_op:
+            batch_op.add_column(sa.Column(
+                'content_compressed',
+                sa.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql'),
+                nullable=True,
+            ))
+
+
+def downgrade():
+    with op.batch_alter_table('notes') as batch_op:
+        batch_op.drop_column('content_compressed')
@@ -0,0 +1,39 @@
+"""composite indexes for the feed, my-notes, favorites and contributor queries
+
+Revision ID: 0006_hot_query_indexes
+Revises: 0005_note_content_compressed
+Create Date: 2026-10-18 12:00:00.000000
+
+`python -m benchmarks.check_query_plans` verifies the endpoints use them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_hot_query_indexes'
+down_revision = '0005_note_content_compressed'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_notes_created', 'notes', ['created_at', 'id', 'visibility']),
+    ('ix_notes_popular', 'notes', ['favorite_count', 'created_at', 'id', 'visibility']),
+    ('ix_notes_user_created', 'notes', ['user_id', 'created_at', 'id']),
+    ('ix_favorites_user_created', 'favorites', ['user_id', 'created_at', 'id']),
+    ('ix_favorites_note', 'favorites', ['note_id']),
+    ('ix_note_contributors_user', 'note_contributors', ['user_id']),
+)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        # create_all() may already have created them on a fresh database
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,34 @@
+"""index note_contributors by (user_id, created_at, id) for the shared-notes feed
+
+Revision ID: 0007_contributor_shared_index
+Revises: 0006_hot_query_indexes
+Create Date: 2026-10-18 18:00:00.000000
+
+Replaces ix_note_contributors_user (user_id), which is a prefix of the new
+index: `GET /api/notes/shared` filters on user_id and pages by
+(created_at, id) without a sort step.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_contributor_shared_index'
+down_revision = '0006_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {index['name'] for index in inspector.get_indexes('note_contributors')}
+    # create_all() may already have created it on a fresh database
+    if 'ix_note_contributors_user_created' not in existing:
+        op.create_index('ix_note_contributors_user_created', 'note_contributors', ['user_id', 'created_at', 'id'])
+    if 'ix_note_contributors_user' in existing:
+        op.drop_index('ix_note_contributors_user', table_name='note_contributors')
+
+
+def downgrade():
+    op.create_index('ix_note_contributors_user', 'note_contributors', ['user_id'])
+    op.drop_index('ix_note_contributors_user_created', table_name='note_contributors')
@@ -0,0 +1,47 @@
+"""note revision history
+
+Revision ID: 0008_note_revisions
+Revises: 0007_contributor_shared_index
+Create Date: 2026-10-18 19:00:00.000000
+
+One row per version of a note; content is a compressed keyframe or a delta
+against the previous revision (see app.services.revisions).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_note_revisions'
+down_revision = '0007_contributor_shared_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_all() may already have created it on a fresh database
+    if 'note_revisions' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'note_revisions',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('note_id', sa.Integer(), nullable=False),
+        sa.Column('number', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('is_keyframe', sa.Boolean(), nullable=False),
+        sa.Column('data', sa.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql'), nullable=False),
+        sa.Column('content_length', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['note_id'], ['notes.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('note_id', 'number', name='unique_note_revision'),
+    )
+
+
+def downgrade():
+    op.drop_table('note_revisions')
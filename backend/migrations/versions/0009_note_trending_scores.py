@@ -0,0 +1,53 @@
+"""trending rankings and the favorites index their refresh reads
+
+Revision ID: 0009_note_trending_scores
+Revises: 0008_note_revisions
+Create Date: 2026-10-18 21:00:00.000000
+
+Scores are filled by `flask notes refresh-trending` (see app.services.trending).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_note_trending_scores'
+down_revision = '0008_note_revisions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    # create_all() may already have created them on a fresh database
+    if 'note_trending_scores' not in tables:
+        op.create_table(
+            'note_trending_scores',
+            sa.Column('note_id', sa.Integer(), nullable=False),
+            sa.Column('period', sa.String(length=8), nullable=False),
+            sa.Column('score', sa.Double(), nullable=False),
+            sa.ForeignKeyConstraint(['note_id'], ['notes.id']),
+            sa.PrimaryKeyConstraint('note_id', 'period'),
+        )
+        op.create_index('ix_trending_period_score', 'note_trending_scores', ['period', 'score', 'note_id'])
+
+    if 'trending_windows' not in tables:
+        op.create_table(
+            'trending_windows',
+            sa.Column('period', sa.String(length=8), nullable=False),
+            sa.Column('epoch', sa.DateTime(), nullable=False),
+            sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('period'),
+        )
+
+    if 'ix_favorites_created' not in {index['name'] for index in inspector.get_indexes('favorites')}:
+        op.create_index('ix_favorites_created', 'favorites', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_favorites_created', table_name='favorites')
+    op.drop_table('trending_windows')
+    op.drop_index('ix_trending_period_score', table_name='note_trending_scores')
+    op.drop_table('note_trending_scores')
@@ -0,0 +1,46 @@
+"""seed the trending windows
+
+Revision ID: 0010_seed_trending_windows
+Revises: 0009_note_trending_scores
+Create Date: 2026-10-18 23:00:00.000000
+
+Favoriting only updates periods that have a row in trending_windows, and
+refresh-trending used to be the only thing creating one. Start both periods
+at an epoch of now, so rankings fill from the first favorite on; the next
+`flask notes refresh-trending` also counts the favorites made before.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_seed_trending_windows'
+down_revision = '0009_note_trending_scores'
+branch_labels = None
+depends_on = None
+
+# app.services.trending.PERIODS, as of this revision
+PERIODS = ('24h', '7d')
+
+trending_windows = sa.table(
+    'trending_windows',
+    sa.column('period', sa.String),
+    sa.column('epoch', sa.DateTime),
+    sa.column('refreshed_at', sa.DateTime),
+)
+
+
+def upgrade():
+    existing = {period for (period,) in op.get_bind().execute(sa.select(trending_windows.c.period))}
+    epoch = datetime.utcnow().replace(microsecond=0)
+    rows = [{'period': period, 'epoch': epoch, 'refreshed_at': None} for period in PERIODS if period not in existing]
+    if rows:
+        op.bulk_insert(trending_windows, rows)
+
+
+def downgrade():
+    # Only the seeds; windows a refresh has advanced are kept
+    op.execute(trending_windows.delete().where(trending_windows.c.period.in_(PERIODS),
+                                               trending_windows.c.refreshed_at.is_(None)))
@@ -0,0 +1,69 @@
+"""Shared fixtures: an app on a fresh in-memory database per test, and a query budget.
+
+Run from the backend directory:
+
+    pip install -r requirements-dev.txt
+    python -m pytest
+"""
+import os
+from contextlib import contextmanager
+
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['BCRYPT_ROUNDS'] = '4'
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+os.environ['FEED_CACHE_ENABLED'] = '0'
+
+from app import create_app, db  # noqa: E402
+from app.services.query_detector import detect_queries  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """``register(name)`` creates an account and returns its auth headers."""
+    def register(name):
+        response = client.post('/api/auth/register', json={
+            'username': name, 'email': f'{name}@example.com', 'password': 'secret1',
+            'security_question': 'Apa makanan favorit Anda?', 'security_answer': 'nasi',
+        })
+        assert response.status_code == 201, response.get_json()
+        return {'Authorization': f"Bearer {response.get_json()['token']}"}
+    return register
+
+
+@pytest.fixture
+def create_note(client):
+    """``create_note(headers, **fields)`` creates a note and returns its id."""
+    def create_note(headers, **fields):
+        body = {'title': 'Note', 'content': 'content', 'visibility': 'public', **fields}
+        response = client.post('/api/notes', json=body, headers=headers)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['note']['id']
+    return create_note
+
+
+@pytest.fixture
+def assert_max_queries(app):
+    """``with assert_max_queries(n):`` fails the test if the block runs more than ``n``
+    statements, or repeats one statement shape more than ``threshold`` times (an N+1)."""
+    @contextmanager
+    def assert_max_queries(n, threshold=3):
+        with detect_queries(threshold=threshold, slow_ms=float('inf'), mode='raise', where='test') as report:
+            yield report
+        assert report.total <= n, f'{report.total} queries, expected at most {n}:\n' + '\n'.join(report.shapes)
+    return assert_max_queries
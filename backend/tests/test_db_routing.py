@@ -0,0 +1,42 @@
+import pytest
+
+from app import create_app, db
+from app.services.db_routing import PRIMARY_UNTIL_HEADER, REPLICA_BIND
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    """An app whose read replica never receives any write, as if it lagged forever."""
+    monkeypatch.setenv('DATABASE_REPLICA_URL', f'sqlite:///{tmp_path}/replica.db')
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.metadata.create_all(db.engines[REPLICA_BIND])
+    # No app context held open: each request gets its own session, as in production
+    yield app
+    # init_app registered the bind on the shared db; later apps have no replica
+    db.metadatas.pop(REPLICA_BIND, None)
+
+
+def test_client_reads_its_own_writes_from_the_primary(client, register, create_note):
+    headers = register('alice')
+    response = client.post('/api/notes', json={'title': 'Fresh', 'content': 'content'}, headers=headers)
+    note_id = response.get_json()['note']['id']
+    primary_until = response.headers[PRIMARY_UNTIL_HEADER]
+
+    assert client.get(f'/api/notes/{note_id}', headers=headers).status_code == 404
+    echoed = {**headers, PRIMARY_UNTIL_HEADER: primary_until}
+    assert client.get(f'/api/notes/{note_id}', headers=echoed).status_code == 200
+
+
+@pytest.mark.parametrize('value', ['0', 'soon', '99999999999'])
+def test_stale_or_bogus_header_reads_from_the_replica(client, register, create_note, value):
+    headers = register('alice')
+    note_id = create_note(headers)
+    response = client.get(f'/api/notes/{note_id}', headers={**headers, PRIMARY_UNTIL_HEADER: value})
+    assert response.status_code == 404
+
+
+def test_reads_do_not_set_the_header(client, register):
+    headers = register('alice')
+    assert PRIMARY_UNTIL_HEADER not in client.get('/api/notes/my', headers=headers).headers
@@ -0,0 +1,27 @@
+from sqlalchemy import event, insert
+
+from app.models.favorite import Favorite
+from app.services.db_routing import RoutingSession
+
+
+def test_batch_favorite_redoes_a_write_that_raced(app, client, register, create_note):
+    headers = register('alice')
+    note_id = create_note(headers)
+    raced = []
+
+    def concurrent_batch(state):
+        # Another batch favorites the same note between this one's read and insert
+        if state.is_insert and not raced:
+            raced.append(True)
+            state.session.execute(insert(Favorite).values(user_id=1, note_id=note_id))
+
+    event.listen(RoutingSession, 'do_orm_execute', concurrent_batch)
+    try:
+        response = client.post('/api/favorites/batch', json={'note_ids': [note_id]}, headers=headers)
+    finally:
+        event.remove(RoutingSession, 'do_orm_execute', concurrent_batch)
+
+    assert raced
+    assert response.status_code == 200
+    assert response.get_json()['results'] == [{'note_id': note_id, 'status': 200, 'is_favorited': True}]
+    assert client.get(f'/api/notes/{note_id}', headers=headers).get_json()['note']['favorite_count'] == 1
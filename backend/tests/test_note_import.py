@@ -0,0 +1,25 @@
+import io
+import json
+
+
+def _upload(client, headers, records):
+    body = '\n'.join(json.dumps(record) for record in records).encode()
+    return client.post('/api/notes/import', headers=headers,
+                       data={'file': (io.BytesIO(body), 'notes.ndjson')}, content_type='multipart/form-data')
+
+
+def _protected(i):
+    return {'title': f'Locked {i}', 'content': 'content', 'visibility': 'protected', 'password': 'pw1234'}
+
+
+def test_import_caps_protected_notes(app, client, register):
+    app.config['MAX_PROTECTED_PER_REQUEST'] = 2
+    headers = register('alice')
+
+    response = _upload(client, headers, [_protected(i) for i in range(2)] + [{'title': 'Open', 'content': 'content'}])
+    assert response.status_code == 200
+    assert response.get_json()['imported'] == 3
+
+    response = _upload(client, headers, [_protected(i) for i in range(3)])
+    assert response.status_code == 413
+    assert client.get('/api/notes/my', headers=headers).get_json()['total'] == 3
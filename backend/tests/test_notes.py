@@ -0,0 +1,26 @@
+def test_shared_feed_hides_notes_made_private(client, register, create_note):
+    alice = register('alice')
+    bob = register('bob')
+    listed_id = create_note(bob, title='Listed')
+    private_id = create_note(bob, title='Secret')
+    for note_id in (listed_id, private_id):
+        client.post(f'/api/notes/{note_id}/contributors', json={'email': 'alice@example.com'}, headers=bob)
+    response = client.put(f'/api/notes/{private_id}', json={'title': 'Secret', 'content': 'content',
+                                                            'visibility': 'private'}, headers=bob)
+    assert response.status_code == 200, response.get_json()
+
+    response = client.get('/api/notes/shared', headers=alice)
+    assert [note['id'] for note in response.get_json()['notes']] == [listed_id]
+
+
+def test_batch_create_caps_protected_notes(app, client, register):
+    app.config['MAX_PROTECTED_PER_REQUEST'] = 2
+    headers = register('alice')
+    locked = {'title': 'Locked', 'content': 'content', 'visibility': 'protected', 'password': 'pw1234'}
+
+    response = client.post('/api/notes/batch', json={'notes': [locked] * 3}, headers=headers)
+    assert response.status_code == 400
+    assert client.get('/api/notes/my', headers=headers).get_json()['total'] == 0
+
+    response = client.post('/api/notes/batch', json={'notes': [locked] * 2}, headers=headers)
+    assert response.get_json()['created'] == 2
@@ -0,0 +1,36 @@
+import base64
+import json
+
+import pytest
+
+
+def _cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('values', [
+    [None, None],
+    ['2026-01-01T00:00:00', None],
+    ['2026-01-01T00:00:00', '7'],
+    ['2026-01-01T00:00:00', 7.5],
+    ['yesterday', 7],
+    [1767225600, 7],
+    ['2026-01-01T00:00:00'],
+])
+def test_malformed_cursor_is_a_bad_request(client, register, values):
+    headers = register('alice')
+    response = client.get(f'/api/notes/my?cursor={_cursor(values)}', headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
+
+
+def test_cursor_walks_every_page(client, register, create_note):
+    headers = register('alice')
+    created = [create_note(headers, title=f'Note {i}') for i in range(5)]
+
+    seen, cursor = [], ''
+    while cursor is not None:
+        body = client.get(f'/api/notes/my?cursor={cursor}&per_page=2', headers=headers).get_json()
+        seen += [note['id'] for note in body['notes']]
+        cursor = body['next_cursor']
+    assert seen == created[::-1]
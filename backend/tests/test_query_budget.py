@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.mark.parametrize('path', ['/api/notes', '/api/notes/my', '/api/favorites', '/api/notes/shared'])
+def test_feeds_have_a_fixed_query_budget(client, register, create_note, assert_max_queries, path):
+    alice = register('alice')
+    bob = register('bob')
+    for i in range(12):
+        client.post(f'/api/favorites/{create_note(alice, title=f"Alice {i}")}', headers=alice)
+        shared_id = create_note(bob, title=f'Bob {i}')
+        client.post(f'/api/notes/{shared_id}/contributors', json={'email': 'alice@example.com'}, headers=bob)
+
+    with assert_max_queries(4):
+        response = client.get(f'{path}?cursor=&per_page=10', headers=alice)
+    assert response.status_code == 200
+    assert len(response.get_json()['notes']) == 10
@@ -0,0 +1,16 @@
+def test_contributor_cannot_read_history_of_private_note(client, register, create_note):
+    alice = register('alice')
+    bob = register('bob')
+    note_id = create_note(alice, title='Draft', content='first')
+    client.post(f'/api/notes/{note_id}/contributors', json={'email': 'bob@example.com'}, headers=alice)
+    client.put(f'/api/notes/{note_id}', json={'title': 'Draft', 'content': 'second'}, headers=bob)
+    assert client.get(f'/api/notes/{note_id}/revisions', headers=bob).status_code == 200
+
+    response = client.put(f'/api/notes/{note_id}', json={'title': 'Draft', 'content': 'second',
+                                                         'visibility': 'private'}, headers=alice)
+    assert response.status_code == 200, response.get_json()
+
+    assert client.get(f'/api/notes/{note_id}', headers=bob).status_code == 403
+    assert client.get(f'/api/notes/{note_id}/revisions', headers=bob).status_code == 403
+    assert client.get(f'/api/notes/{note_id}/revisions/1', headers=bob).status_code == 403
+    assert client.get(f'/api/notes/{note_id}/revisions/1', headers=alice).status_code == 200
@@ -3,6 +3,9 @@ const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5001/api';
 class ApiService {
     constructor() {
         this.baseURL = API_URL;
+        this.noteEtags = new Map();
+        // Set by a write; echoed back so the next reads skip a lagging read replica
+        this.primaryUntil = null;
     }
 
     getToken() {
@@ -16,16 +19,21 @@ class ApiService {
         const url = `${this.baseURL}${endpoint}`;
         const token = this.getToken();
 
+        const { headers, onEtag, ...rest } = options;
         const config = {
+            ...rest,
             headers: {
                 'Content-Type': 'application/json',
                 ...(token && { Authorization: `Bearer ${token}` }),
-                ...options.headers,
+                ...(this.primaryUntil && { 'X-Primary-Until': this.primaryUntil }),
+                ...headers,
             },
-            ...options,
         };
 
         const response = await fetch(url, config);
+        if (response.headers.get('X-Primary-Until')) {
+            this.primaryUntil = response.headers.get('X-Primary-Until');
+        }
         const data = await response.json();
 
         if (!response.ok) {
@@ -34,6 +42,10 @@ class ApiService {
             throw err;
         }
 
+        if (options.onEtag && response.headers.get('ETag')) {
+            options.onEtag(response.headers.get('ETag'));
+        }
+
         return data;
     }
 
@@ -105,8 +117,29 @@ class ApiService {
         return this.request(`/notes/my?${query}`);
     }
 
+    async getSharedNotes(params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return this.request(`/notes/shared?${query}`);
+    }
+
+    async getTrendingNotes(params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return this.request(`/notes/trending?${query}`);
+    }
+
+    getNoteGrant(id) {
+        if (typeof window !== 'undefined') {
+            return sessionStorage.getItem(`note_grant_${id}`);
+        }
+        return null;
+    }
+
     async getNote(id) {
-        return this.request(`/notes/${id}`);
+        const grant = this.getNoteGrant(id);
+        return this.request(`/notes/${id}`, {
+            headers: grant ? { 'X-Note-Grant': grant } : {},
+            onEtag: (etag) => this.noteEtags.set(String(id), etag),
+        });
     }
 
     async createNote(data) {
@@ -117,9 +150,13 @@ class ApiService {
     }
 
     async updateNote(id, data) {
+        // If-Match makes the server reject the save if someone else edited the note meanwhile
+        const etag = this.noteEtags.get(String(id));
         return this.request(`/notes/${id}`, {
             method: 'PUT',
             body: JSON.stringify(data),
+            headers: etag ? { 'If-Match': etag } : {},
+            onEtag: (newEtag) => this.noteEtags.set(String(id), newEtag),
         });
     }
 
@@ -127,11 +164,30 @@ class ApiService {
         return this.request(`/notes/${id}`, { method: 'DELETE' });
     }
 
+    async batchCreateNotes(notes) {
+        return this.request('/notes/batch', {
+            method: 'POST',
+            body: JSON.stringify({ notes }),
+        });
+    }
+
+    async batchDeleteNotes(ids) {
+        return this.request('/notes/batch-delete', {
+            method: 'POST',
+            body: JSON.stringify({ ids }),
+        });
+    }
+
     async verifyNotePassword(id, password) {
-        return this.request(`/notes/${id}/verify-password`, {
+        const data = await this.request(`/notes/${id}/verify-password`, {
             method: 'POST',
             body: JSON.stringify({ password }),
         });
+        // Short-lived grant lets the note be reopened without re-entering the password
+        if (data.access_grant && typeof window !== 'undefined') {
+            sessionStorage.setItem(`note_grant_${id}`, data.access_grant);
+        }
+        return data;
     }
 
     // Contributors
@@ -139,6 +195,18 @@ class ApiService {
         return this.request(`/notes/${noteId}/contributors`);
     }
 
+    async getRevisions(noteId, params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return this.request(`/notes/${noteId}/revisions?${query}`);
+    }
+
+    async getRevision(noteId, number) {
+        const grant = this.getNoteGrant(noteId);
+        return this.request(`/notes/${noteId}/revisions/${number}`, {
+            headers: grant ? { 'X-Note-Grant': grant } : {},
+        });
+    }
+
     async addContributor(noteId, email) {
         return this.request(`/notes/${noteId}/contributors`, {
             method: 'POST',
@@ -152,6 +220,22 @@ class ApiService {
         });
     }
 
+    // Returns a Blob; format is 'ndjson' or 'zip'
+    async exportNotes(format = 'ndjson') {
+        const token = this.getToken();
+        const response = await fetch(`${this.baseURL}/notes/export?format=${format}`, {
+            headers: {
+                ...(token && { Authorization: `Bearer ${token}` }),
+                ...(this.primaryUntil && { 'X-Primary-Until': this.primaryUntil }),
+            },
+        });
+        if (!response.ok) {
+            const data = await response.json();
+            throw new Error(data.error || 'Something went wrong');
+        }
+        return response.blob();
+    }
+
     // Favorites
     async getFavorites(params = {}) {
         const query = new URLSearchParams(params).toString();
@@ -161,6 +245,13 @@ class ApiService {
     async toggleFavorite(noteId) {
         return this.request(`/favorites/${noteId}`, { method: 'POST' });
     }
+
+    async setFavorites(noteIds, favorite = true) {
+        return this.request('/favorites/batch', {
+            method: 'POST',
+            body: JSON.stringify({ note_ids: noteIds, favorite }),
+        });
+    }
 }
 
 const api = new ApiService();